@@ -3,21 +3,31 @@ Admin routes for GalacticStocks.
 Simple password-based admin panel for managing companies, timesteps, and viewing player stats.
 """
 import logging
-from fastapi import APIRouter, HTTPException, Depends, Header
-from pydantic import BaseModel
-from typing import List, Optional
-import json
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, PositiveFloat, ValidationError
+from typing import Dict, List, Optional
+import anyio
+import numpy as np
+import orjson
+import hmac
 import os
+import re
+from dataclasses import asdict
 from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
 
-from models import StockPrice
+from models import Company, StockPrice
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/admin", tags=["admin"])
+router = APIRouter(prefix="/api/admin", tags=["admin"], default_response_class=ORJSONResponse)
 
 # Simple password auth - no JWT, no bcrypt for D&D campaign simplicity
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "galacticstocks123")
+_ADMIN_PASSWORD_BYTES = ADMIN_PASSWORD.encode()
 
 # These will be injected from main.py during startup
 db_instance = None
@@ -35,7 +45,20 @@ def get_market():
         raise RuntimeError("Market not initialized")
     return market_instance
 
-def verify_admin(x_admin_password: str = Header(None)):
+def _check_password(password: Optional[str]) -> bool:
+    """Compare a password against ADMIN_PASSWORD in constant time.
+
+    Args:
+        password: Candidate password (may be None)
+
+    Returns:
+        True if the password matches
+    """
+    if password is None:
+        return False
+    return hmac.compare_digest(password.encode(), _ADMIN_PASSWORD_BYTES)
+
+def verify_admin(x_admin_password: Optional[str] = Header(None)):
     """Verify admin password from header.
 
     Args:
@@ -47,11 +70,15 @@ def verify_admin(x_admin_password: str = Header(None)):
     Raises:
         HTTPException: If password is invalid
     """
-    if x_admin_password != ADMIN_PASSWORD:
-        logger.warning(f"Failed admin authentication attempt")
+    if not _check_password(x_admin_password):
+        logger.warning("Failed admin authentication attempt")
         raise HTTPException(status_code=401, detail="Invalid admin password")
     return True
 
+# Shared dependency marker for admin-only endpoints. FastAPI analyses
+# verify_admin's signature once, when each route is registered.
+require_admin = Depends(verify_admin)
+
 # Pydantic models for requests
 class PasswordRequest(BaseModel):
     """Request to verify password."""
@@ -74,48 +101,159 @@ class UpdateCompanyRequest(BaseModel):
 
 class TimestepOverrides(BaseModel):
     """Request to generate timestep with price overrides."""
-    overrides: dict[str, float] = {}
+    overrides: dict[str, PositiveFloat] = {}
+
+def json_body(model: type[BaseModel]):
+    """Build a dependency that validates the raw request body against a model.
+
+    Uses Pydantic's model_validate_json, which parses and validates in one
+    Rust pass instead of json.loads followed by model validation.
+
+    Args:
+        model: Pydantic model class for the body
+
+    Returns:
+        Dependency callable returning a validated model instance
+    """
+    async def parse(request: Request) -> BaseModel:
+        try:
+            return model.model_validate_json(await request.body())
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors()]
+            )
+
+    return parse
+
+def body_schema(model: type[BaseModel]) -> dict:
+    """OpenAPI requestBody entry for routes that parse with json_body().
+
+    Args:
+        model: Pydantic model class for the body
+
+    Returns:
+        Dictionary for the route's openapi_extra
+    """
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model.model_json_schema()}}
+        }
+    }
+
+# Ticker symbols are ASCII, so uppercase them with a fixed table instead of str.upper()
+_UPPER = str.maketrans("abcdefghijklmnopqrstuvwxyz", "ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+_SYMBOL_RE = re.compile(r"[A-Z0-9]{1,8}")
 
-# Companies JSON file path
+# Companies JSON file path (seed data and export target; the database is authoritative)
 COMPANIES_FILE = os.path.join(os.path.dirname(__file__), "companies.json")
 
-def load_companies() -> List[dict]:
-    """Load companies from JSON file.
+# Upper bounds for the simulated path preview
+MAX_PREVIEW_PATHS = 10_000
+MAX_PREVIEW_STEPS = 250
+
+def _read_companies_json() -> List[Company]:
+    """Read companies from the JSON file.
 
     Returns:
-        List of company dictionaries
+        List of Company objects
     """
     if not os.path.exists(COMPANIES_FILE):
         logger.warning(f"Companies file not found: {COMPANIES_FILE}")
         return []
 
     try:
-        with open(COMPANIES_FILE, 'r') as f:
-            companies = json.load(f)
-            logger.debug(f"Loaded {len(companies)} companies from JSON")
-            return companies
+        with open(COMPANIES_FILE, 'rb') as f:
+            data = orjson.loads(f.read())
+        return [
+            Company(
+                symbol=c["symbol"],
+                name=c["name"],
+                initial_price=c["initial_price"],
+                trend=c["trend"],
+                volatility=c["volatility"],
+                description=c.get("description", "")
+            )
+            for c in data
+        ]
     except Exception as e:
         logger.error(f"Error loading companies: {e}")
         return []
 
-def save_companies(companies: List[dict]):
+def migrate_companies(db):
+    """Import companies.json into the companies table on first run.
+
+    Does nothing once the table has any rows.
+
+    Args:
+        db: Database instance
+    """
+    if db.get_companies():
+        return
+
+    companies = _read_companies_json()
+    if companies:
+        db.insert_companies(companies)
+        logger.info(f"Migrated {len(companies)} companies from {COMPANIES_FILE}")
+
+def _company_arrays(companies: List[Company]) -> tuple[np.ndarray, np.ndarray]:
+    """Pack company trend and volatility parameters into arrays.
+
+    Args:
+        companies: List of Company objects
+
+    Returns:
+        Tuple of (trends, volatilities) arrays, in company order
+    """
+    count = len(companies)
+    trends = np.fromiter((c.trend for c in companies), dtype=np.float64, count=count)
+    volatilities = np.fromiter((c.volatility for c in companies), dtype=np.float64, count=count)
+    return trends, volatilities
+
+def _save_companies_sync(companies: List[dict]):
     """Save companies to JSON file.
 
+    Writes to a temporary file and renames it over companies.json, so a
+    crash mid-write never leaves a truncated file behind.
+
     Args:
         companies: List of company dictionaries
     """
+    tmp_file = COMPANIES_FILE + ".tmp"
     try:
-        with open(COMPANIES_FILE, 'w') as f:
-            json.dump(companies, f, indent=2)
+        with open(tmp_file, 'wb') as f:
+            f.write(orjson.dumps(companies, option=orjson.OPT_INDENT_2))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, COMPANIES_FILE)
         logger.info(f"Saved {len(companies)} companies to JSON")
     except Exception as e:
         logger.error(f"Error saving companies: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to save companies: {e}")
 
+async def save_companies(companies: List[dict]):
+    """Save companies to JSON file without blocking the event loop.
+
+    Args:
+        companies: List of company dictionaries
+    """
+    await anyio.to_thread.run_sync(_save_companies_sync, companies)
+
+def companies_dep() -> List[Company]:
+    """Dependency providing the company list.
+
+    FastAPI caches dependency results for the lifetime of a request, so every
+    consumer in one request shares a single query.
+
+    Returns:
+        List of Company objects
+    """
+    return get_db().get_companies()
+
 
 # Auth endpoint
-@router.post("/verify")
-async def verify_password(request: PasswordRequest):
+@router.post("/verify", openapi_extra=body_schema(PasswordRequest))
+async def verify_password(request: PasswordRequest = Depends(json_body(PasswordRequest))):
     """Verify admin password.
 
     Args:
@@ -124,27 +262,70 @@ async def verify_password(request: PasswordRequest):
     Returns:
         Authentication status
     """
-    authenticated = request.password == ADMIN_PASSWORD
+    authenticated = _check_password(request.password)
     logger.info(f"Admin password verification: {'success' if authenticated else 'failed'}")
     return {"authenticated": authenticated}
 
 
 # Company CRUD endpoints
 @router.get("/companies")
-async def get_companies(_: bool = Depends(verify_admin)):
-    """Get all companies from JSON file.
+async def get_companies(
+    _: bool = require_admin,
+    companies: List[Company] = Depends(companies_dep)
+):
+    """Get all companies.
 
     Returns:
         List of companies
     """
     logger.info("Admin: Fetching all companies")
-    return load_companies()
+    return [asdict(c) for c in companies]
+
+
+@router.post("/companies/export")
+async def export_companies(
+    _: bool = require_admin,
+    companies: List[Company] = Depends(companies_dep)
+):
+    """Write the current companies to companies.json.
+
+    Returns:
+        Success message with company count
+    """
+    await save_companies([asdict(c) for c in companies])
+
+    logger.info(f"Admin: Exported {len(companies)} companies to JSON")
+
+    return {
+        "message": "Companies exported successfully",
+        "count": len(companies)
+    }
+
+
+def _insert_company_sync(company: Company):
+    """Insert a new company, rejecting duplicate symbols.
 
+    Args:
+        company: Company to insert
+
+    Raises:
+        HTTPException: If the symbol already exists
+    """
+    db = get_db()
+
+    # Check for duplicate symbol
+    if db.get_company(company.symbol) is not None:
+        logger.warning(f"Admin: Attempt to create duplicate company: {company.symbol}")
+        raise HTTPException(status_code=400, detail=f"Symbol {company.symbol} already exists")
 
-@router.post("/companies")
+    db.insert_companies([company])
+    get_market().sheets_client.invalidate_cache()
+
+
+@router.post("/companies", openapi_extra=body_schema(CreateCompanyRequest))
 async def create_company(
-    request: CreateCompanyRequest,
-    _: bool = Depends(verify_admin)
+    _: bool = require_admin,
+    request: CreateCompanyRequest = Depends(json_body(CreateCompanyRequest))
 ):
     """Create a new company.
 
@@ -154,13 +335,9 @@ async def create_company(
     Returns:
         Success message with symbol
     """
-    companies = load_companies()
-
-    # Check for duplicate symbol
-    symbol_upper = request.symbol.upper()
-    if any(c["symbol"] == symbol_upper for c in companies):
-        logger.warning(f"Admin: Attempt to create duplicate company: {symbol_upper}")
-        raise HTTPException(status_code=400, detail=f"Symbol {symbol_upper} already exists")
+    symbol_upper = request.symbol.translate(_UPPER)
+    if not _SYMBOL_RE.fullmatch(symbol_upper):
+        raise HTTPException(status_code=400, detail="Symbol must be 1-8 letters or digits")
 
     # Validate parameters
     if request.initial_price <= 0:
@@ -168,18 +345,14 @@ async def create_company(
     if request.volatility <= 0:
         raise HTTPException(status_code=400, detail="Volatility must be positive")
 
-    # Create new company
-    new_company = {
-        "symbol": symbol_upper,
-        "name": request.name,
-        "initial_price": request.initial_price,
-        "trend": request.trend,
-        "volatility": request.volatility,
-        "description": request.description
-    }
-
-    companies.append(new_company)
-    save_companies(companies)
+    await anyio.to_thread.run_sync(_insert_company_sync, Company(
+        symbol=symbol_upper,
+        name=request.name,
+        initial_price=request.initial_price,
+        trend=request.trend,
+        volatility=request.volatility,
+        description=request.description
+    ))
 
     logger.info(f"Admin: Created company {symbol_upper}: {request.name}")
 
@@ -189,11 +362,11 @@ async def create_company(
     }
 
 
-@router.patch("/companies/{symbol}")
+@router.patch("/companies/{symbol}", openapi_extra=body_schema(UpdateCompanyRequest))
 async def update_company(
     symbol: str,
-    request: UpdateCompanyRequest,
-    _: bool = Depends(verify_admin)
+    _: bool = require_admin,
+    request: UpdateCompanyRequest = Depends(json_body(UpdateCompanyRequest))
 ):
     """Update an existing company.
 
@@ -204,11 +377,34 @@ async def update_company(
     Returns:
         Success message
     """
-    companies = load_companies()
-    symbol_upper = symbol.upper()
+    symbol_upper = symbol.translate(_UPPER)
+    updated_fields = await anyio.to_thread.run_sync(_update_company_sync, symbol_upper, request)
+
+    logger.info(f"Admin: Updated company {symbol_upper}: {', '.join(updated_fields)}")
+
+    return {
+        "message": f"Company {symbol_upper} updated successfully",
+        "updated_fields": updated_fields
+    }
+
+
+def _update_company_sync(symbol_upper: str, request: UpdateCompanyRequest) -> List[str]:
+    """Apply an update request to a stored company.
+
+    Args:
+        symbol_upper: Upper-case stock symbol
+        request: Update request with optional fields
+
+    Returns:
+        Names of the fields that were updated
+
+    Raises:
+        HTTPException: If the company doesn't exist or a value is invalid
+    """
+    db = get_db()
 
     # Find company
-    company = next((c for c in companies if c["symbol"] == symbol_upper), None)
+    company = db.get_company(symbol_upper)
     if not company:
         logger.warning(f"Admin: Attempt to update non-existent company: {symbol_upper}")
         raise HTTPException(status_code=404, detail=f"Company {symbol_upper} not found")
@@ -216,31 +412,26 @@ async def update_company(
     # Update fields
     updated_fields = []
     if request.trend is not None:
-        company["trend"] = request.trend
+        company.trend = request.trend
         updated_fields.append("trend")
     if request.volatility is not None:
         if request.volatility <= 0:
             raise HTTPException(status_code=400, detail="Volatility must be positive")
-        company["volatility"] = request.volatility
+        company.volatility = request.volatility
         updated_fields.append("volatility")
     if request.description is not None:
-        company["description"] = request.description
+        company.description = request.description
         updated_fields.append("description")
 
-    save_companies(companies)
-
-    logger.info(f"Admin: Updated company {symbol_upper}: {', '.join(updated_fields)}")
-
-    return {
-        "message": f"Company {symbol_upper} updated successfully",
-        "updated_fields": updated_fields
-    }
+    db.update_company(company)
+    get_market().sheets_client.invalidate_cache()
+    return updated_fields
 
 
 @router.delete("/companies/{symbol}")
 async def delete_company(
     symbol: str,
-    _: bool = Depends(verify_admin)
+    _: bool = require_admin
 ):
     """Delete a company.
 
@@ -250,18 +441,12 @@ async def delete_company(
     Returns:
         Success message
     """
-    companies = load_companies()
-    symbol_upper = symbol.upper()
-
-    # Filter out the company
-    original_count = len(companies)
-    companies = [c for c in companies if c["symbol"] != symbol_upper]
+    symbol_upper = symbol.translate(_UPPER)
 
-    if len(companies) == original_count:
+    if not await anyio.to_thread.run_sync(get_db().delete_company, symbol_upper):
         logger.warning(f"Admin: Attempt to delete non-existent company: {symbol_upper}")
         raise HTTPException(status_code=404, detail=f"Company {symbol_upper} not found")
-
-    save_companies(companies)
+    get_market().sheets_client.invalidate_cache()
 
     logger.info(f"Admin: Deleted company {symbol_upper}")
 
@@ -272,7 +457,10 @@ async def delete_company(
 
 # Timestep control endpoints
 @router.get("/timestep/preview")
-async def preview_timestep(_: bool = Depends(verify_admin)):
+async def preview_timestep(
+    _: bool = require_admin,
+    companies: List[Company] = Depends(companies_dep)
+):
     """Preview what the next timestep prices would be.
 
     Returns:
@@ -280,30 +468,31 @@ async def preview_timestep(_: bool = Depends(verify_admin)):
     """
     logger.info("Admin: Generating timestep preview")
 
-    companies = load_companies()
-    db = get_db()
     market = get_market()
 
-    previews = []
-    for company in companies:
-        # Get current price
-        current_price_obj = db.get_latest_price(company["symbol"])
-        current_price = current_price_obj.price if current_price_obj else company["initial_price"]
-
-        # Calculate next price using market simulator
-        calculated_price = market.calculate_next_price(
-            company["symbol"],
-            company["trend"],
-            company["volatility"],
-            current_price
-        )
+    latest_prices = await anyio.to_thread.run_sync(
+        get_db().get_latest_prices, [c.symbol for c in companies]
+    )
+
+    current_prices = [
+        latest_prices[c.symbol].price if c.symbol in latest_prices else c.initial_price
+        for c in companies
+    ]
+
+    # Calculate next prices using market simulator
+    calculated_prices = market.calculate_next_prices(
+        *_company_arrays(companies),
+        np.array(current_prices, dtype=np.float64)
+    ).tolist()
 
+    previews = []
+    for company, current_price, calculated_price in zip(companies, current_prices, calculated_prices):
         # Calculate change percentage
         change_pct = ((calculated_price - current_price) / current_price) * 100
 
         previews.append({
-            "symbol": company["symbol"],
-            "name": company["name"],
+            "symbol": company.symbol,
+            "name": company.name,
             "current_price": current_price,
             "calculated_price": calculated_price,
             "change_pct": change_pct
@@ -314,10 +503,73 @@ async def preview_timestep(_: bool = Depends(verify_admin)):
     return {"previews": previews}
 
 
-@router.post("/timestep/generate")
+def _preview_paths_sync(symbol: str, n_paths: int, n_steps: int) -> Optional[Dict[str, List[float]]]:
+    """Simulate paths for a company and reduce them to summary bands.
+
+    Reads the company's current trend and volatility from the database, so
+    edits made since the last timestep are reflected.
+
+    Args:
+        symbol: Stock symbol (uppercase)
+        n_paths: Number of simulated paths
+        n_steps: Number of timesteps to look ahead
+
+    Returns:
+        Dict of mean, p5, p50 and p95 lists, or None if the company doesn't exist
+    """
+    company = get_db().get_company(symbol)
+    if company is None:
+        return None
+
+    paths = get_market().simulate_paths(company, n_paths, n_steps)
+    p5, p50, p95 = np.percentile(paths, [5, 50, 95], axis=0).tolist()
+    return {"mean": paths.mean(axis=0).tolist(), "p5": p5, "p50": p50, "p95": p95}
+
+
+@router.get("/timestep/preview/{symbol}/paths")
+async def preview_paths(
+    symbol: str,
+    n_paths: int = 1000,
+    n_steps: int = 10,
+    _: bool = require_admin
+):
+    """Simulate possible price paths for one company.
+
+    Args:
+        symbol: Stock symbol
+        n_paths: Number of simulated paths
+        n_steps: Number of timesteps to look ahead
+
+    Returns:
+        Mean path and 5th/50th/95th percentile bands, one value per timestep
+    """
+    symbol_upper = symbol.translate(_UPPER)
+
+    if not (1 <= n_paths <= MAX_PREVIEW_PATHS and 1 <= n_steps <= MAX_PREVIEW_STEPS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"n_paths must be 1-{MAX_PREVIEW_PATHS} and n_steps 1-{MAX_PREVIEW_STEPS}"
+        )
+
+    logger.info(f"Admin: Simulating {n_paths} paths of {n_steps} steps for {symbol_upper}")
+
+    bands = await anyio.to_thread.run_sync(_preview_paths_sync, symbol_upper, n_paths, n_steps)
+    if bands is None:
+        raise HTTPException(status_code=404, detail=f"Company {symbol_upper} not found")
+
+    return {
+        "symbol": symbol_upper,
+        "n_paths": n_paths,
+        "n_steps": n_steps,
+        **bands
+    }
+
+
+@router.post("/timestep/generate", openapi_extra=body_schema(TimestepOverrides))
 async def generate_timestep(
-    request: TimestepOverrides,
-    _: bool = Depends(verify_admin)
+    _: bool = require_admin,
+    request: TimestepOverrides = Depends(json_body(TimestepOverrides)),
+    companies: List[Company] = Depends(companies_dep)
 ):
     """Generate a new timestep with optional price overrides.
 
@@ -329,58 +581,14 @@ async def generate_timestep(
     """
     logger.info(f"Admin: Generating new timestep with {len(request.overrides)} overrides")
 
-    companies = load_companies()
-    db = get_db()
-    market = get_market()
-
-    # Reload market's in-memory company list to pick up any new companies
-    market.load_companies()
-
-    # Get current market state
-    market_state = db.get_market_state()
-    next_timestep = market_state.current_timestep + 1
-
-    logger.info(f"Admin: Creating timestep {next_timestep}")
-
-    # Generate prices for each company
-    for company in companies:
-        symbol = company["symbol"]
-
-        # Get current price
-        current_price_obj = db.get_latest_price(symbol)
-        current_price = current_price_obj.price if current_price_obj else company["initial_price"]
-
-        # Check for override, otherwise calculate
-        if symbol in request.overrides:
-            next_price = request.overrides[symbol]
-            is_override = True
-            logger.info(f"Admin: Using override price for {symbol}: ¢{next_price:.2f}")
-        else:
-            next_price = market.calculate_next_price(
-                symbol,
-                company["trend"],
-                company["volatility"],
-                current_price
-            )
-            is_override = False
-
-        # Save the new price
-        db.save_stock_price(StockPrice(
-            symbol=symbol,
-            timestep=next_timestep,
-            price=next_price,
-            timestamp=datetime.now(),
-            is_override=is_override
-        ))
-
-        logger.debug(f"Admin: Set {symbol} price at timestep {next_timestep}: ¢{next_price:.2f}")
-
-    # Update market state
-    market_state.current_timestep = next_timestep
-    market_state.last_updated = datetime.now()
-    db.update_market_state(market_state)
+    next_timestep = await anyio.to_thread.run_sync(
+        _generate_timestep_sync, request.overrides, companies
+    )
 
-    logger.info(f"Admin: Successfully generated timestep {next_timestep}")
+    logger.info(
+        f"Admin: Successfully generated timestep {next_timestep}: "
+        f"updated {len(companies)} symbols, overrides={len(request.overrides)}"
+    )
 
     return {
         "message": "Timestep generated successfully",
@@ -390,9 +598,111 @@ async def generate_timestep(
     }
 
 
+def _generate_timestep_sync(overrides: Dict[str, float], companies: List[Company]) -> int:
+    """Generate and save the next timestep under the generation lock.
+
+    Args:
+        overrides: Override price per symbol
+        companies: Companies to price
+
+    Returns:
+        The new timestep number
+
+    Raises:
+        HTTPException: If a timestep is already being generated
+    """
+    db = get_db()
+    market = get_market()
+
+    # Same lock as StockMarket.generate_timestep, so the two can't interleave
+    if not db.try_acquire_generation_lock():
+        logger.warning("Admin: Timestep generation already in progress")
+        raise HTTPException(status_code=409, detail="Timestep generation already in progress")
+    lock_held = True
+
+    try:
+        # Reload market's in-memory company list to pick up any new companies,
+        # reading the sheet afresh rather than through its TTL cache
+        market.sheets_client.invalidate_cache()
+        market.load_companies()
+
+        # Get current market state
+        market_state = db.get_market_state()
+        next_timestep = market_state.current_timestep + 1
+
+        logger.info(f"Admin: Creating timestep {next_timestep}")
+
+        latest_prices = db.get_latest_prices([c.symbol for c in companies])
+
+        current_prices = np.array([
+            latest_prices[c.symbol].price if c.symbol in latest_prices else c.initial_price
+            for c in companies
+        ], dtype=np.float64)
+        calculated_prices = market.calculate_next_prices(
+            *_company_arrays(companies),
+            current_prices
+        ).tolist()
+
+        # Generate prices for each company
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        now = datetime.now()
+        new_prices = []
+        for company, calculated_price in zip(companies, calculated_prices):
+            symbol = company.symbol
+
+            # Check for override, otherwise use the calculated price
+            if symbol in overrides:
+                next_price = overrides[symbol]
+                is_override = True
+                logger.info("Admin: Using override price for %s: ¢%.2f", symbol, next_price)
+            else:
+                next_price = calculated_price
+                is_override = False
+
+            new_prices.append(StockPrice(
+                symbol=symbol,
+                timestep=next_timestep,
+                price=next_price,
+                timestamp=now,
+                is_override=is_override
+            ))
+
+            if debug_enabled:
+                logger.debug("Admin: Set %s price at timestep %d: ¢%.2f", symbol, next_timestep, next_price)
+
+        # Save the new prices and market state, releasing the lock
+        market_state.current_timestep = next_timestep
+        market_state.last_updated = now
+        db.finalize_timestep(new_prices, market_state)
+        lock_held = False
+
+        return next_timestep
+
+    finally:
+        if lock_held:
+            db.set_generation_lock(False)
+
+
 # Player stats endpoint
+def _stream_players(players: List[dict]):
+    """Encode the player list as a JSON object one player at a time.
+
+    Args:
+        players: Player stat dictionaries, already sorted
+
+    Yields:
+        Chunks of the {"players": [...]} response body
+    """
+    yield b'{"players":['
+    for i, player in enumerate(players):
+        if i:
+            yield b','
+        yield orjson.dumps(player)
+    yield b']}'
+
+
 @router.get("/players")
-async def get_player_stats(_: bool = Depends(verify_admin)):
+async def get_player_stats(_: bool = require_admin):
     """Get statistics for all players.
 
     Returns:
@@ -400,64 +710,84 @@ async def get_player_stats(_: bool = Depends(verify_admin)):
     """
     logger.info("Admin: Fetching player statistics")
 
+    players = await anyio.to_thread.run_sync(_player_stats_sync)
+
+    logger.info(f"Admin: Returning stats for {len(players)} players")
+
+    return StreamingResponse(_stream_players(players), media_type="application/json")
+
+
+def _player_stats_sync() -> List[dict]:
+    """Compute every character's holdings and totals.
+
+    Returns:
+        Player stat dictionaries, sorted by profit/loss descending
+    """
     db = get_db()
 
-    # Get all unique character names
+    # Join every holding against its symbol's latest price in one query
     with db.get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT character_name FROM portfolios WHERE quantity > 0")
-        characters = [row['character_name'] for row in cursor.fetchall()]
-
-    logger.debug(f"Admin: Found {len(characters)} characters with holdings")
-
-    # Build player stats
-    players = []
-    for character in characters:
-        portfolio = db.get_portfolio(character)
-
-        # Get current prices for holdings
-        current_prices = {}
-        for holding in portfolio.holdings:
-            price_obj = db.get_latest_price(holding.symbol)
-            if price_obj:
-                current_prices[holding.symbol] = price_obj.price
-
-        # Build holdings data
-        holdings_data = []
-        for holding in portfolio.holdings:
-            current_price = current_prices.get(holding.symbol, holding.avg_purchase_price)
-            current_value = holding.calculate_current_value(current_price)
-            profit_loss = holding.calculate_profit_loss(current_price)
-
-            holdings_data.append({
-                "symbol": holding.symbol,
-                "quantity": holding.quantity,
-                "avg_price": holding.avg_purchase_price,
-                "current_value": current_value,
-                "cost_basis": holding.total_cost_basis,
-                "profit_loss": profit_loss
+        cursor.row_factory = None  # Plain tuples, indexed positionally below
+        cursor.execute("""
+            SELECT p.character_name, p.symbol, p.quantity, p.avg_purchase_price,
+                   COALESCE(sp.price, p.avg_purchase_price) AS current_price
+            FROM portfolios p
+            LEFT JOIN (
+                SELECT symbol, MAX(timestep) AS timestep
+                FROM prices.stock_prices
+                GROUP BY symbol
+            ) latest ON latest.symbol = p.symbol
+            LEFT JOIN prices.stock_prices sp
+                ON sp.symbol = latest.symbol AND sp.timestep = latest.timestep
+            WHERE p.quantity > 0
+            ORDER BY p.character_name
+        """)
+
+        # Aggregate per character in a single pass over the cursor
+        players = []
+        for character_name, rows in groupby(cursor, key=itemgetter(0)):
+            holdings_data = []
+            total_value = 0.0
+            total_cost_basis = 0.0
+
+            for _, symbol, quantity, avg_price, current_price in rows:
+                current_value = quantity * current_price
+                cost_basis = quantity * avg_price
+                profit_loss = current_value - cost_basis
+
+                holdings_data.append({
+                    "symbol": symbol,
+                    "quantity": quantity,
+                    "avg_price": avg_price,
+                    "current_value": current_value,
+                    "cost_basis": cost_basis,
+                    "profit_loss": profit_loss
+                })
+                total_value += current_value
+                total_cost_basis += cost_basis
+
+            total_profit_loss = total_value - total_cost_basis
+            players.append({
+                "character_name": character_name,
+                "total_value": total_value,
+                "cost_basis": total_cost_basis,
+                "profit_loss": total_profit_loss,
+                "profit_loss_pct": (total_profit_loss / total_cost_basis * 100)
+                if total_cost_basis != 0 else 0.0,
+                "holdings": holdings_data
             })
 
-        players.append({
-            "character_name": character,
-            "total_value": portfolio.total_value,
-            "cost_basis": portfolio.total_cost_basis,
-            "profit_loss": portfolio.total_profit_loss,
-            "profit_loss_pct": portfolio.profit_loss_percentage,
-            "holdings": holdings_data
-        })
+    logger.debug(f"Admin: Found {len(players)} characters with holdings")
 
     # Sort by profit/loss descending
     players.sort(key=lambda p: p["profit_loss"], reverse=True)
-
-    logger.info(f"Admin: Returning stats for {len(players)} players")
-
-    return {"players": players}
+    return players
 
 
 # Market reset endpoint
 @router.post("/reset-market")
-async def reset_market(_: bool = Depends(verify_admin)):
+async def reset_market(_: bool = require_admin):
     """Reset the market to timestep 0 with initial prices.
 
     WARNING: This deletes ALL market data including:
@@ -470,32 +800,29 @@ async def reset_market(_: bool = Depends(verify_admin)):
     """
     logger.warning("Admin: Resetting market - THIS WILL DELETE ALL DATA")
 
-    db = get_db()
-    market = get_market()
+    deleted = await anyio.to_thread.run_sync(_reset_market_sync)
 
-    # Delete all data
-    with db.get_connection() as conn:
-        cursor = conn.cursor()
+    logger.info("Admin: Market reset complete")
 
-        # Delete all stock prices
-        cursor.execute("DELETE FROM stock_prices")
-        deleted_prices = cursor.rowcount
+    return {
+        "message": "Market reset successfully",
+        "timestep": 0,
+        "companies_initialized": len(get_market().companies),
+        "deleted": deleted
+    }
 
-        # Delete all transactions
-        cursor.execute("DELETE FROM transactions")
-        deleted_transactions = cursor.rowcount
 
-        # Delete all portfolio holdings
-        cursor.execute("DELETE FROM portfolios")
-        deleted_holdings = cursor.rowcount
+def _reset_market_sync() -> dict:
+    """Delete all market data and reinitialize the starting prices.
 
-        # Reset market state to timestep 0
-        cursor.execute(
-            "UPDATE market_state SET current_timestep = 0, last_updated = ?",
-            (datetime.now(),)
-        )
+    Returns:
+        Number of deleted prices, transactions and holdings
+    """
+    db = get_db()
+    market = get_market()
 
-        conn.commit()
+    # Delete all data
+    deleted_prices, deleted_transactions, deleted_holdings = db.clear_market_data()
 
     logger.info(
         f"Admin: Deleted {deleted_prices} prices, {deleted_transactions} transactions, "
@@ -505,15 +832,8 @@ async def reset_market(_: bool = Depends(verify_admin)):
     # Reinitialize market with starting prices
     market.initialize_market()
 
-    logger.info("Admin: Market reset complete")
-
     return {
-        "message": "Market reset successfully",
-        "timestep": 0,
-        "companies_initialized": len(market.companies),
-        "deleted": {
-            "prices": deleted_prices,
-            "transactions": deleted_transactions,
-            "holdings": deleted_holdings
-        }
+        "prices": deleted_prices,
+        "transactions": deleted_transactions,
+        "holdings": deleted_holdings
     }
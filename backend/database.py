@@ -4,9 +4,14 @@ Handles all data persistence including stock prices, portfolios, and transaction
 """
 import sqlite3
 import logging
-from datetime import datetime
-from typing import Optional, List
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, List, Tuple
 from contextlib import contextmanager
+from itertools import product
 
 from models import (
     Company, StockPrice, PortfolioHolding, Transaction,
@@ -15,60 +20,465 @@ from models import (
 
 logger = logging.getLogger(__name__)
 
+# Applied to every new connection (these settings are not persisted in the file).
+# The {schema} PRAGMAs are run for both the main and the attached "prices"
+# database, which holds stock_prices so price writes and checkpoints don't share
+# a WAL with player data.
+_CONNECTION_PRAGMAS = """
+    PRAGMA temp_store=MEMORY;
+    PRAGMA busy_timeout=5000;
+"""
+_SCHEMA_PRAGMAS = """
+    PRAGMA {schema}.synchronous=NORMAL;
+    PRAGMA {schema}.mmap_size=268435456;
+    PRAGMA {schema}.cache_size=-65536;
+"""
+
+
+# Timestamps are stored as INTEGER microseconds since 1970-01-01 of the naive
+# (local wall-clock) datetimes the app uses, so they round-trip exactly
+_EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+# Tables whose timestamp column used to be ISO-8601 TEXT: (table, old, new)
+_LEGACY_TIMESTAMP_COLUMNS = (
+    ("stock_prices", "timestamp", "timestamp_us"),
+    ("transactions", "timestamp", "timestamp_us"),
+    ("market_state", "last_updated", "last_updated_us"),
+)
+
+# Tables kept in the attached prices database, with their columns. The market
+# state lives beside the prices so a timestep's prices and its state update
+# commit in one file, atomically.
+_PRICES_DB_TABLES = (
+    ("stock_prices", "symbol, timestep, price, timestamp_us, is_override"),
+    ("market_state", "id, current_timestep, last_updated_us, is_generating"),
+)
+
+
+def datetime_to_us(dt: datetime) -> int:
+    """Convert a naive datetime to the integer stored in *_us columns.
+
+    Args:
+        dt: Datetime to convert
+
+    Returns:
+        Microseconds since 1970-01-01
+    """
+    return (dt - _EPOCH) // _ONE_MICROSECOND
+
+
+def us_to_datetime(us: int) -> datetime:
+    """Convert an integer read from a *_us column back to a datetime.
+
+    Args:
+        us: Microseconds since 1970-01-01
+
+    Returns:
+        Naive datetime
+    """
+    return _EPOCH + timedelta(microseconds=us)
+
+
+# Converters for result columns aliased as "name [TYPE]" (see _connect). Values
+# arrive as the bytes of the stored integer, so rows come back as bool/datetime
+# without per-row conversion in the query methods.
+sqlite3.register_converter("BOOLEAN", lambda value: value == b"1")
+sqlite3.register_converter("TIMESTAMP_US", lambda value: us_to_datetime(int(value)))
+
+
+# Statements used by the data-access methods. Keeping each SQL text in one
+# constant means every call passes the identical string, so sqlite3's
+# per-connection statement cache (cached_statements) hits on pooled
+# connections and the SQL is only parsed and planned once per connection.
+
+_SQL_GET_COMPANIES = """
+    SELECT symbol, name, initial_price, trend, volatility, description
+    FROM companies
+    ORDER BY rowid
+"""
+
+_SQL_GET_COMPANY = """
+    SELECT symbol, name, initial_price, trend, volatility, description
+    FROM companies
+    WHERE symbol = ?
+"""
+
+_SQL_INSERT_COMPANY = """
+    INSERT INTO companies
+    (symbol, name, initial_price, trend, volatility, description)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_UPDATE_COMPANY = """
+    UPDATE companies
+    SET name = ?, initial_price = ?, trend = ?, volatility = ?, description = ?
+    WHERE symbol = ?
+"""
+
+_SQL_DELETE_COMPANY = "DELETE FROM companies WHERE symbol = ?"
+
+# Upserts update conflicting rows in place; INSERT OR REPLACE would delete and
+# re-insert them, rewriting every index entry for the row
+_SQL_SAVE_STOCK_PRICE = """
+    INSERT INTO prices.stock_prices
+    (symbol, timestep, price, timestamp_us, is_override)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (symbol, timestep) DO UPDATE SET
+        price = excluded.price,
+        timestamp_us = excluded.timestamp_us,
+        is_override = excluded.is_override
+"""
+
+_SQL_UPDATE_MARKET_STATE = """
+    UPDATE prices.market_state
+    SET current_timestep = ?, last_updated_us = ?, is_generating = ?
+    WHERE id = 1
+"""
+
+_SQL_GET_LATEST_PRICE = """
+    SELECT symbol, timestep, price,
+           timestamp_us AS "timestamp [TIMESTAMP_US]",
+           is_override AS "is_override [BOOLEAN]"
+    FROM prices.stock_prices
+    WHERE symbol = ?
+    ORDER BY timestep DESC
+    LIMIT 1
+"""
+
+_SQL_GET_RECENT_PRICE_HISTORY = """
+    SELECT symbol, timestep, price,
+           timestamp_us AS "timestamp [TIMESTAMP_US]",
+           is_override AS "is_override [BOOLEAN]"
+    FROM (
+        SELECT symbol, timestep, price, timestamp_us, is_override
+        FROM prices.stock_prices
+        WHERE symbol = ?
+        ORDER BY timestep DESC
+        LIMIT ?
+    )
+    ORDER BY timestep ASC
+"""
+
+_SQL_GET_PRICE_HISTORY = """
+    SELECT symbol, timestep, price,
+           timestamp_us AS "timestamp [TIMESTAMP_US]",
+           is_override AS "is_override [BOOLEAN]"
+    FROM prices.stock_prices
+    WHERE symbol = ?
+    ORDER BY timestep ASC
+"""
+
+_SQL_GET_ALL_LATEST_PRICES = """
+    SELECT sp.symbol, sp.price
+    FROM prices.stock_prices sp
+    JOIN (
+        SELECT symbol, MAX(timestep) AS timestep
+        FROM prices.stock_prices
+        GROUP BY symbol
+    ) latest ON sp.symbol = latest.symbol AND sp.timestep = latest.timestep
+"""
+
+_SQL_GET_PORTFOLIO = """
+    SELECT p.character_name, p.symbol, p.quantity, p.avg_purchase_price,
+           sp.price AS current_price
+    FROM portfolios p
+    LEFT JOIN (
+        SELECT symbol, MAX(timestep) AS timestep
+        FROM prices.stock_prices
+        GROUP BY symbol
+    ) latest ON latest.symbol = p.symbol
+    LEFT JOIN prices.stock_prices sp
+        ON sp.symbol = latest.symbol AND sp.timestep = latest.timestep
+    WHERE p.character_name = ? AND p.quantity > 0
+"""
+
+_SQL_GET_HOLDING = """
+    SELECT character_name, symbol, quantity, avg_purchase_price
+    FROM portfolios
+    WHERE character_name = ? AND symbol = ?
+"""
+
+_SQL_SAVE_HOLDING = """
+    INSERT INTO portfolios
+    (character_name, symbol, quantity, avg_purchase_price)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (character_name, symbol) DO UPDATE SET
+        quantity = excluded.quantity,
+        avg_purchase_price = excluded.avg_purchase_price
+"""
+
+_SQL_DELETE_HOLDING = """
+    DELETE FROM portfolios
+    WHERE character_name = ? AND symbol = ?
+"""
+
+_SQL_SAVE_TRANSACTION = """
+    INSERT INTO transactions
+    (character_name, symbol, transaction_type, quantity, price,
+     total_amount, timestamp_us, timestep)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_GET_MARKET_STATE = """
+    SELECT current_timestep,
+           last_updated_us AS "last_updated [TIMESTAMP_US]",
+           is_generating AS "is_generating [BOOLEAN]"
+    FROM prices.market_state
+    WHERE id = 1
+"""
+
+_SQL_SET_GENERATION_LOCK = """
+    UPDATE prices.market_state
+    SET is_generating = ?
+    WHERE id = 1
+"""
+
+_SQL_TRY_ACQUIRE_GENERATION_LOCK = """
+    UPDATE prices.market_state
+    SET is_generating = 1
+    WHERE id = 1 AND is_generating = 0
+"""
+
+_SQL_IS_GENERATION_LOCKED = """
+    SELECT is_generating AS "is_generating [BOOLEAN]" FROM prices.market_state WHERE id = 1
+"""
+
+
+def _transactions_query(by_character: bool, by_symbol: bool, limited: bool) -> str:
+    """Build the transactions query for one combination of filters."""
+    query = """
+    SELECT id, character_name, symbol, transaction_type, quantity, price, total_amount,
+           timestamp_us AS "timestamp [TIMESTAMP_US]", timestep
+    FROM transactions
+    WHERE 1=1"""
+    if by_character:
+        query += " AND character_name = ?"
+    if by_symbol:
+        query += " AND symbol = ?"
+    query += " ORDER BY timestamp_us DESC"
+    if limited:
+        query += " LIMIT ?"
+    return query
+
+
+# Every transactions query shape, keyed by (by_character, by_symbol, limited), so
+# each call reuses one of eight fixed statements
+_SQL_GET_TRANSACTIONS = {
+    key: _transactions_query(*key)
+    for key in product((False, True), repeat=3)
+}
+
 
 class Database:
     """SQLite database manager for GalacticStocks."""
 
-    def __init__(self, db_path: str = "galactic_market.db"):
-        """Initialize database connection.
+    def __init__(
+        self,
+        db_path: str = "galactic_market.db",
+        prices_db_path: Optional[str] = None,
+        pool_size: int = 4
+    ):
+        """Initialize database connection pool.
 
         Args:
-            db_path: Path to SQLite database file
+            db_path: Path to SQLite database file, or ":memory:" for a private
+                in-memory database shared by this instance's connections.
+                The in-memory mode is for tests only: its pooled readers see
+                uncommitted writes (see _connect)
+            prices_db_path: Path to the stock price database file
+                (default: db_path with a "_prices" suffix)
+            pool_size: Number of connections kept open for reuse
         """
         self.db_path = db_path
+        self._in_memory = db_path == ":memory:"
+        if self._in_memory:
+            logger.warning("Using an in-memory database; for tests only, readers see uncommitted writes")
+            # Plain ":memory:" gives every connection its own empty database; a
+            # named shared-cache URI lets the pool and write connection share one.
+            # The name is unique per instance so separate Databases stay separate.
+            name = f"galacticstocks-{uuid.uuid4().hex}"
+            self._connect_path = f"file:{name}?mode=memory&cache=shared"
+            prices_db_path = f"file:{name}-prices?mode=memory&cache=shared"
+        else:
+            self._connect_path = db_path
+            if prices_db_path is None:
+                root, ext = os.path.splitext(db_path)
+                prices_db_path = f"{root}_prices{ext or '.db'}"
+        self.prices_db_path = prices_db_path
+        self._pool: queue.Queue = queue.Queue(maxsize=pool_size)
+
+        # Latest prices only change when prices are written, so reads are cached
+        # until the next write. The generation counter stops a read that raced
+        # a write from caching the pre-write value.
+        self._all_prices_cache: Optional[dict[str, float]] = None
+        self._price_cache_generation = 0
+        self._price_cache_lock = threading.Lock()
+
+        # All writes go through one connection, serialized by _write_lock, so
+        # writers queue in-process instead of failing with "database is locked".
+        # It also switches the files to WAL (a persistent setting), and for
+        # in-memory databases keeps them alive until close().
+        self._write_conn = self._connect()
+        if not self._in_memory:
+            self._write_conn.execute("PRAGMA main.journal_mode=WAL")
+            self._write_conn.execute("PRAGMA prices.journal_mode=WAL")
+        # Reentrant so price writes can invalidate the price cache before
+        # releasing it (see save_stock_prices)
+        self._write_lock = threading.RLock()
+
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+
         self._init_database()
         logger.info(f"Database initialized at {db_path}")
 
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with the per-connection PRAGMAs applied.
+
+        WAL with synchronous=NORMAL drops the fsync on each commit, so a power
+        loss can roll back the last few commits, but never corrupts the file.
+
+        Returns:
+            sqlite3.Connection in autocommit mode (transactions are explicit)
+        """
+        conn = sqlite3.connect(
+            self._connect_path,
+            check_same_thread=False,  # Pooled connections move between threads
+            isolation_level=None,
+            detect_types=sqlite3.PARSE_COLNAMES,  # Apply "name [TYPE]" column converters
+            uri=self._in_memory
+        )
+        conn.execute("ATTACH DATABASE ? AS prices", (self.prices_db_path,))
+        conn.executescript(
+            _CONNECTION_PRAGMAS
+            + _SCHEMA_PRAGMAS.format(schema="main")
+            + _SCHEMA_PRAGMAS.format(schema="prices")
+        )
+        if self._in_memory:
+            # Shared-cache readers take table locks that fail writers at once
+            # with SQLITE_LOCKED (busy_timeout doesn't retry it). Reading
+            # uncommitted data skips those locks, at the cost of dirty reads:
+            # unlike WAL readers on disk, a reader can see a half-applied
+            # transaction, or rows that are later rolled back. Acceptable for
+            # the test-only in-memory mode; trades still read prices on the
+            # single write connection, which no other writer can dirty.
+            conn.execute("PRAGMA read_uncommitted=1")
+        conn.row_factory = sqlite3.Row  # Access columns by name
+        return conn
+
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections.
+        """Context manager for pooled read connections.
+
+        Checks a connection out of the pool and runs the block in a single
+        transaction; writes belong in get_write_connection. If every pooled
+        connection is checked out, a temporary connection is opened instead
+        of blocking. A transaction left open by a generator that was closed
+        early is rolled back before the connection goes back to the pool.
 
         Yields:
             sqlite3.Connection: Database connection
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Access columns by name
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
+        conn.execute("BEGIN")
         try:
             yield conn
-            conn.commit()
+            if conn.in_transaction:
+                conn.execute("COMMIT")
         except Exception as e:
-            conn.rollback()
             logger.error(f"Database error: {e}")
             raise
         finally:
-            conn.close()
+            # Also covers GeneratorExit, which "except Exception" doesn't catch
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def get_write_connection(self):
+        """Context manager for the shared write connection.
+
+        Holds the write lock for the whole block and opens the transaction with
+        BEGIN IMMEDIATE, so the database write lock is taken up front rather
+        than when the first write statement runs. Not reentrant: do not call
+        another write method from inside the block.
+
+        Yields:
+            sqlite3.Connection: Database connection
+        """
+        with self._write_lock:
+            conn = self._write_conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                if conn.in_transaction:
+                    conn.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                # Rejected trades (LookupError/ValueError) are reported by the caller
+                if not isinstance(e, (LookupError, ValueError)):
+                    logger.error(f"Database error: {e}")
+                raise
+
+    def invalidate_price_cache(self):
+        """Drop cached latest prices.
+
+        Called after every stock price write; callers that modify stock_prices
+        with raw SQL must call it too.
+        """
+        with self._price_cache_lock:
+            self._all_prices_cache = None
+            self._price_cache_generation += 1
+
+    @property
+    def price_cache_generation(self) -> int:
+        """Counter bumped by every price cache invalidation, i.e. every price write."""
+        return self._price_cache_generation
+
+    def close(self):
+        """Close the write connection and all pooled connections."""
+        with self._write_lock:
+            self._write_conn.close()
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
 
     def _init_database(self):
         """Create database tables if they don't exist."""
-        with self.get_connection() as conn:
+        with self.get_write_connection() as conn:
             cursor = conn.cursor()
 
-            # Stock prices table
+            # Move tables with TEXT timestamps aside; they are recreated below
+            legacy_tables = self._detach_legacy_timestamp_tables(cursor)
+
+            # Stock prices table (in the attached prices database)
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS stock_prices (
+                CREATE TABLE IF NOT EXISTS prices.stock_prices (
                     symbol TEXT NOT NULL,
                     timestep INTEGER NOT NULL,
                     price REAL NOT NULL,
-                    timestamp TEXT NOT NULL,
+                    timestamp_us INTEGER NOT NULL,
                     is_override INTEGER DEFAULT 0,
                     PRIMARY KEY (symbol, timestep)
                 )
             """)
 
-            # Create index for faster price history queries
+            # Covering index so latest-price and history lookups never touch the table
+            cursor.execute("DROP INDEX IF EXISTS main.idx_stock_prices_symbol")
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_stock_prices_symbol
-                ON stock_prices(symbol, timestep DESC)
+                CREATE INDEX IF NOT EXISTS prices.idx_stock_prices_cover
+                ON stock_prices(symbol, timestep DESC, price, is_override, timestamp_us)
             """)
 
             # Portfolios table
@@ -92,91 +502,347 @@ class Database:
                     quantity INTEGER NOT NULL,
                     price REAL NOT NULL,
                     total_amount REAL NOT NULL,
-                    timestamp TEXT NOT NULL,
+                    timestamp_us INTEGER NOT NULL,
                     timestep INTEGER NOT NULL
                 )
             """)
 
-            # Create index for transaction queries
+            # Indexes for each transactions query filter, all ordered newest first
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_transactions_character
-                ON transactions(character_name, timestamp DESC)
+                ON transactions(character_name, timestamp_us DESC)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_tx_symbol_ts
+                ON transactions(symbol, timestamp_us DESC)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_tx_char_sym_ts
+                ON transactions(character_name, symbol, timestamp_us DESC)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_tx_ts
+                ON transactions(timestamp_us DESC)
             """)
 
-            # Market state table
+            # Market state table (in the prices database, see _PRICES_DB_TABLES)
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS market_state (
+                CREATE TABLE IF NOT EXISTS prices.market_state (
                     id INTEGER PRIMARY KEY CHECK (id = 1),
                     current_timestep INTEGER NOT NULL DEFAULT 0,
-                    last_updated TEXT NOT NULL,
+                    last_updated_us INTEGER NOT NULL,
                     is_generating INTEGER DEFAULT 0
                 )
             """)
 
+            # Companies table (rowid preserves insertion order)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS companies (
+                    symbol TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    initial_price REAL NOT NULL,
+                    trend REAL NOT NULL,
+                    volatility REAL NOT NULL,
+                    description TEXT NOT NULL DEFAULT ''
+                )
+            """)
+
+            if legacy_tables:
+                self._copy_legacy_timestamp_tables(cursor, legacy_tables)
+            self._move_prices_to_attached_database(cursor)
+
             # Initialize market state if not exists
-            cursor.execute("SELECT COUNT(*) FROM market_state WHERE id = 1")
+            cursor.execute("SELECT COUNT(*) FROM prices.market_state WHERE id = 1")
             if cursor.fetchone()[0] == 0:
                 cursor.execute("""
-                    INSERT INTO market_state (id, current_timestep, last_updated, is_generating)
+                    INSERT INTO prices.market_state (id, current_timestep, last_updated_us, is_generating)
                     VALUES (1, 0, ?, 0)
-                """, (datetime.now().isoformat(),))
+                """, (datetime_to_us(datetime.now()),))
                 logger.info("Initialized market state at timestep 0")
 
-    # Stock Price Methods
+    def _detach_legacy_timestamp_tables(self, cursor: sqlite3.Cursor) -> List[tuple]:
+        """Rename tables that still store ISO-8601 TEXT timestamps.
 
-    def save_stock_price(self, stock_price: StockPrice):
-        """Save a stock price to the database.
+        Their indexes are dropped so the current definitions can be created
+        under the same names.
 
         Args:
-            stock_price: StockPrice object to save
+            cursor: Cursor inside the _init_database transaction
+
+        Returns:
+            (table, old_column, new_column) entries for each renamed table
+        """
+        legacy_tables = []
+        for table, old_column, new_column in _LEGACY_TIMESTAMP_COLUMNS:
+            # Legacy tables only ever existed in the main database
+            cursor.execute(f"PRAGMA main.table_info({table})")
+            if old_column not in {row['name'] for row in cursor.fetchall()}:
+                continue
+
+            cursor.execute(
+                "SELECT name FROM main.sqlite_master "
+                "WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                (table,)
+            )
+            for (index_name,) in cursor.fetchall():
+                cursor.execute(f"DROP INDEX main.{index_name}")
+
+            cursor.execute(f"ALTER TABLE main.{table} RENAME TO {table}_legacy")
+            legacy_tables.append((table, old_column, new_column))
+        return legacy_tables
+
+    def _copy_legacy_timestamp_tables(self, cursor: sqlite3.Cursor, legacy_tables: List[tuple]):
+        """Copy rows from renamed legacy tables, converting timestamps to microseconds.
+
+        Args:
+            cursor: Cursor inside the _init_database transaction
+            legacy_tables: Entries returned by _detach_legacy_timestamp_tables
+        """
+        for table, old_column, new_column in legacy_tables:
+            schema = "prices" if table in dict(_PRICES_DB_TABLES) else "main"
+            target = f"{schema}.{table}"
+            cursor.execute(f"PRAGMA {schema}.table_info({table})")
+            columns = [row['name'] for row in cursor.fetchall()]
+            select = [
+                # Whole seconds via strftime, plus the six fraction digits
+                # isoformat() writes when microseconds are non-zero
+                f"CAST(strftime('%s', {old_column}) AS INTEGER) * 1000000"
+                f" + CAST(substr({old_column} || '.000000', 21, 6) AS INTEGER)"
+                if column == new_column else column
+                for column in columns
+            ]
+            cursor.execute(
+                f"INSERT INTO {target} ({', '.join(columns)}) "
+                f"SELECT {', '.join(select)} FROM main.{table}_legacy"
+            )
+            migrated = cursor.rowcount
+            cursor.execute(f"DROP TABLE main.{table}_legacy")
+            logger.info(f"Migrated {migrated} rows of {table} to integer timestamps")
+
+    def _move_prices_to_attached_database(self, cursor: sqlite3.Cursor):
+        """Move stock_prices and market_state rows left in the main database
+        into the prices database.
+
+        Args:
+            cursor: Cursor inside the _init_database transaction
+        """
+        for table, columns in _PRICES_DB_TABLES:
+            cursor.execute(
+                "SELECT COUNT(*) FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+                (table,)
+            )
+            if cursor.fetchone()[0] == 0:
+                continue
+
+            # OR IGNORE keeps this safe to re-run if a previous move was interrupted
+            cursor.execute(
+                f"INSERT OR IGNORE INTO prices.{table} ({columns}) "
+                f"SELECT {columns} FROM main.{table}"
+            )
+            moved = cursor.rowcount
+            cursor.execute(f"DROP TABLE main.{table}")
+            logger.info(f"Moved {moved} {table} rows to {self.prices_db_path}")
+
+    # Company Methods
+
+    def get_companies(self) -> List[Company]:
+        """Get all companies in creation order.
+
+        Returns:
+            List of Company objects
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT OR REPLACE INTO stock_prices
-                (symbol, timestep, price, timestamp, is_override)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                stock_price.symbol,
-                stock_price.timestep,
-                stock_price.price,
-                stock_price.timestamp.isoformat(),
-                1 if stock_price.is_override else 0
-            ))
-            logger.debug(
-                f"Saved price: {stock_price.symbol} @ timestep {stock_price.timestep} = ¢{stock_price.price:.2f}"
-            )
+            cursor.execute(_SQL_GET_COMPANIES)
 
-    def get_latest_price(self, symbol: str) -> Optional[StockPrice]:
-        """Get the most recent price for a stock.
+            return [
+                Company(
+                    symbol=row['symbol'],
+                    name=row['name'],
+                    initial_price=row['initial_price'],
+                    trend=row['trend'],
+                    volatility=row['volatility'],
+                    description=row['description']
+                )
+                for row in cursor.fetchall()
+            ]
+
+    def get_company(self, symbol: str) -> Optional[Company]:
+        """Get a single company by symbol.
 
         Args:
             symbol: Stock symbol
 
         Returns:
-            StockPrice or None if not found
+            Company or None if not found
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT symbol, timestep, price, timestamp, is_override
-                FROM stock_prices
-                WHERE symbol = ?
-                ORDER BY timestep DESC
-                LIMIT 1
-            """, (symbol,))
-            row = cursor.fetchone()
+            cursor.execute(_SQL_GET_COMPANY, (symbol,))
 
+            row = cursor.fetchone()
             if row:
-                return StockPrice(
+                return Company(
                     symbol=row['symbol'],
-                    timestep=row['timestep'],
-                    price=row['price'],
-                    timestamp=datetime.fromisoformat(row['timestamp']),
-                    is_override=bool(row['is_override'])
+                    name=row['name'],
+                    initial_price=row['initial_price'],
+                    trend=row['trend'],
+                    volatility=row['volatility'],
+                    description=row['description']
                 )
             return None
 
+    def insert_companies(self, companies: List[Company]):
+        """Insert new companies.
+
+        Args:
+            companies: Company objects to insert
+
+        Raises:
+            sqlite3.IntegrityError: If a symbol already exists
+        """
+        with self.get_write_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(_SQL_INSERT_COMPANY, [
+                (c.symbol, c.name, c.initial_price, c.trend, c.volatility, c.description)
+                for c in companies
+            ])
+            logger.info(f"Inserted {len(companies)} companies")
+
+    def update_company(self, company: Company):
+        """Update an existing company's parameters.
+
+        Args:
+            company: Company object with updated fields
+        """
+        with self.get_write_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_UPDATE_COMPANY, (
+                company.name,
+                company.initial_price,
+                company.trend,
+                company.volatility,
+                company.description,
+                company.symbol
+            ))
+            logger.info(f"Updated company: {company.symbol}")
+
+    def delete_company(self, symbol: str) -> bool:
+        """Delete a company.
+
+        Args:
+            symbol: Stock symbol
+
+        Returns:
+            True if a company was deleted, False if it did not exist
+        """
+        with self.get_write_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_DELETE_COMPANY, (symbol,))
+            deleted = cursor.rowcount > 0
+            if deleted:
+                logger.info(f"Deleted company: {symbol}")
+            return deleted
+
+    # Stock Price Methods
+
+    def save_stock_price(self, stock_price: StockPrice):
+        """Save a stock price to the database.
+
+        Args:
+            stock_price: StockPrice object to save
+        """
+        self.save_stock_prices([stock_price])
+
+    def save_stock_prices(
+        self,
+        stock_prices: List[StockPrice],
+        market_state: Optional[MarketState] = None
+    ):
+        """Save several stock prices in a single transaction.
+
+        Args:
+            stock_prices: StockPrice objects to save
+            market_state: Market state to write in the same transaction (optional)
+        """
+        # Hold the write lock until the cache is cleared, so a trade can't
+        # price itself from the cache between this commit and the invalidation.
+        # Invalidate on rollback too: in-memory readers see uncommitted rows,
+        # so the cache may hold prices from a batch that never committed.
+        with self._write_lock:
+            try:
+                with self.get_write_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.executemany(_SQL_SAVE_STOCK_PRICE, (
+                        (
+                            p.symbol,
+                            p.timestep,
+                            p.price,
+                            datetime_to_us(p.timestamp),
+                            1 if p.is_override else 0
+                        )
+                        for p in stock_prices
+                    ))
+
+                    if market_state is not None:
+                        cursor.execute(_SQL_UPDATE_MARKET_STATE, (
+                            market_state.current_timestep,
+                            datetime_to_us(market_state.last_updated),
+                            1 if market_state.is_generating else 0
+                        ))
+
+                    logger.debug("Saved %d prices", len(stock_prices))
+            finally:
+                self.invalidate_price_cache()
+
+    def _cached_latest_price(self, symbol: str) -> Optional[float]:
+        """Look up a stock's latest price in the latest-prices cache only.
+
+        Args:
+            symbol: Stock symbol
+
+        Returns:
+            Cached price, or None if the symbol is not cached
+        """
+        with self._price_cache_lock:
+            if self._all_prices_cache is not None:
+                return self._all_prices_cache.get(symbol)
+        return None
+
+    def get_latest_prices(self, symbols: List[str]) -> dict[str, StockPrice]:
+        """Get the most recent price for several stocks in one query.
+
+        Args:
+            symbols: Stock symbols
+
+        Returns:
+            Dictionary mapping symbol to StockPrice (symbols without history are omitted)
+        """
+        if not symbols:
+            return {}
+
+        placeholders = ", ".join("?" * len(symbols))
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # Plain tuples, unpacked positionally below
+            cursor.execute(f"""
+                SELECT sp.symbol, sp.timestep, sp.price,
+                       sp.timestamp_us AS "timestamp [TIMESTAMP_US]",
+                       sp.is_override AS "is_override [BOOLEAN]"
+                FROM prices.stock_prices sp
+                JOIN (
+                    SELECT symbol, MAX(timestep) AS timestep
+                    FROM prices.stock_prices
+                    WHERE symbol IN ({placeholders})
+                    GROUP BY symbol
+                ) latest ON sp.symbol = latest.symbol AND sp.timestep = latest.timestep
+            """, list(symbols))
+
+            return {
+                row[0]: StockPrice(*row)
+                for row in cursor
+            }
+
     def get_price_history(self, symbol: str, n_periods: Optional[int] = None) -> List[StockPrice]:
         """Get historical prices for a stock.
 
@@ -188,61 +854,80 @@ class Database:
             List of StockPrice objects, ordered by timestep ascending
         """
         with self.get_connection() as conn:
-            cursor = conn.cursor()
+            cursor = self._query_price_history(conn, symbol, n_periods)
+            return [
+                StockPrice(*row)
+                for row in cursor
+            ]
 
-            if n_periods:
-                cursor.execute("""
-                    SELECT symbol, timestep, price, timestamp, is_override
-                    FROM stock_prices
-                    WHERE symbol = ?
-                    ORDER BY timestep DESC
-                    LIMIT ?
-                """, (symbol, n_periods))
-            else:
-                cursor.execute("""
-                    SELECT symbol, timestep, price, timestamp, is_override
-                    FROM stock_prices
-                    WHERE symbol = ?
-                    ORDER BY timestep ASC
-                """, (symbol,))
-
-            rows = cursor.fetchall()
-            prices = [
-                StockPrice(
-                    symbol=row['symbol'],
-                    timestep=row['timestep'],
-                    price=row['price'],
-                    timestamp=datetime.fromisoformat(row['timestamp']),
-                    is_override=bool(row['is_override'])
-                )
-                for row in rows
+    def get_price_history_rows(self, symbol: str, n_periods: Optional[int] = None) -> List[dict]:
+        """Get historical prices for a stock as response-ready dictionaries.
+
+        Skips building and validating StockPrice objects for callers that only
+        serialize the rows.
+
+        Args:
+            symbol: Stock symbol
+            n_periods: Number of most recent periods to retrieve (None for all)
+
+        Returns:
+            List of {timestep, price, timestamp, is_override} dictionaries,
+            ordered by timestep ascending
+        """
+        with self.get_connection() as conn:
+            cursor = self._query_price_history(conn, symbol, n_periods)
+            return [
+                {"timestep": timestep, "price": price, "timestamp": timestamp, "is_override": is_override}
+                for _, timestep, price, timestamp, is_override in cursor
             ]
 
-            # If we limited, reverse to get ascending order
-            if n_periods:
-                prices.reverse()
+    def _query_price_history(
+        self,
+        conn: sqlite3.Connection,
+        symbol: str,
+        n_periods: Optional[int]
+    ) -> sqlite3.Cursor:
+        """Run the price history query for a stock.
 
-            return prices
+        Args:
+            conn: Read connection
+            symbol: Stock symbol
+            n_periods: Number of most recent periods to retrieve (None for all)
+
+        Returns:
+            Cursor over plain (symbol, timestep, price, timestamp, is_override)
+            tuples in ascending timestep order
+        """
+        cursor = conn.cursor()
+        cursor.row_factory = None  # Plain tuples, unpacked positionally by callers
+
+        if n_periods:
+            cursor.execute(_SQL_GET_RECENT_PRICE_HISTORY, (symbol, n_periods))
+        else:
+            cursor.execute(_SQL_GET_PRICE_HISTORY, (symbol,))
+        return cursor
 
     def get_all_latest_prices(self) -> dict[str, float]:
         """Get the latest price for all stocks.
 
         Returns:
-            Dictionary mapping symbol to price
+            Dictionary mapping symbol to price (a copy callers may modify)
         """
+        with self._price_cache_lock:
+            cached = self._all_prices_cache
+            generation = self._price_cache_generation
+        if cached is not None:
+            return dict(cached)
+
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT symbol, price
-                FROM stock_prices sp1
-                WHERE timestep = (
-                    SELECT MAX(timestep)
-                    FROM stock_prices sp2
-                    WHERE sp2.symbol = sp1.symbol
-                )
-            """)
+            cursor.execute(_SQL_GET_ALL_LATEST_PRICES)
+            prices = {row['symbol']: row['price'] for row in cursor.fetchall()}
 
-            return {row['symbol']: row['price'] for row in cursor.fetchall()}
+        with self._price_cache_lock:
+            if generation == self._price_cache_generation:
+                self._all_prices_cache = prices
+        return dict(prices)
 
     # Portfolio Methods
 
@@ -253,35 +938,31 @@ class Database:
             character_name: Character name
 
         Returns:
-            Portfolio object with all holdings and calculations
+            Portfolio object with all holdings, their current prices and totals
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT character_name, symbol, quantity, avg_purchase_price
-                FROM portfolios
-                WHERE character_name = ? AND quantity > 0
-            """, (character_name,))
+            cursor.row_factory = None  # Plain tuples, unpacked positionally below
+            cursor.execute(_SQL_GET_PORTFOLIO, (character_name,))
 
             holdings = []
+            current_prices = []
             total_value = 0.0
             total_cost_basis = 0.0
 
-            for row in cursor.fetchall():
-                holding = PortfolioHolding(
-                    character_name=row['character_name'],
-                    symbol=row['symbol'],
-                    quantity=row['quantity'],
-                    avg_purchase_price=row['avg_purchase_price']
-                )
-                holdings.append(holding)
+            append = holdings.append
+            append_price = current_prices.append
+            for name, symbol, quantity, avg_purchase_price, current_price in cursor:
+                append(PortfolioHolding(name, symbol, quantity, avg_purchase_price))
 
-                # Get current price for calculations
-                current_price_obj = self.get_latest_price(row['symbol'])
-                current_price = current_price_obj.price if current_price_obj else row['avg_purchase_price']
+                # Fall back to cost basis for stocks without price history
+                if current_price is None:
+                    current_price = avg_purchase_price
+                append_price(current_price)
 
-                total_value += holding.calculate_current_value(current_price)
-                total_cost_basis += holding.total_cost_basis
+                # Same as the PortfolioHolding helpers, inlined for the row loop
+                total_value += quantity * current_price
+                total_cost_basis += quantity * avg_purchase_price
 
             total_profit_loss = total_value - total_cost_basis
 
@@ -290,7 +971,8 @@ class Database:
                 holdings=holdings,
                 total_value=total_value,
                 total_cost_basis=total_cost_basis,
-                total_profit_loss=total_profit_loss
+                total_profit_loss=total_profit_loss,
+                current_prices=current_prices
             )
 
     def get_holding(self, character_name: str, symbol: str) -> Optional[PortfolioHolding]:
@@ -305,11 +987,7 @@ class Database:
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT character_name, symbol, quantity, avg_purchase_price
-                FROM portfolios
-                WHERE character_name = ? AND symbol = ?
-            """, (character_name, symbol))
+            cursor.execute(_SQL_GET_HOLDING, (character_name, symbol))
 
             row = cursor.fetchone()
             if row:
@@ -321,128 +999,209 @@ class Database:
                 )
             return None
 
-    def update_portfolio(self, holding: PortfolioHolding):
-        """Update or insert a portfolio holding.
+    def _write_holding(self, cursor: sqlite3.Cursor, holding: PortfolioHolding):
+        """Upsert a holding, or delete it if its quantity is zero.
 
         Args:
+            cursor: Cursor on the write connection
             holding: PortfolioHolding to save
         """
-        with self.get_connection() as conn:
+        if holding.quantity > 0:
+            cursor.execute(_SQL_SAVE_HOLDING, (
+                holding.character_name,
+                holding.symbol,
+                holding.quantity,
+                holding.avg_purchase_price
+            ))
+            logger.info(
+                "Updated portfolio: %s - %s: %d @ ¢%.2f",
+                holding.character_name, holding.symbol,
+                holding.quantity, holding.avg_purchase_price
+            )
+        else:
+            # Remove holding if quantity is zero
+            cursor.execute(_SQL_DELETE_HOLDING, (holding.character_name, holding.symbol))
+            logger.info(
+                "Removed portfolio holding: %s - %s",
+                holding.character_name, holding.symbol
+            )
+
+    # Transaction Methods
+
+    def execute_trade(
+        self,
+        character_name: str,
+        symbol: str,
+        transaction_type: TransactionType,
+        quantity: int
+    ) -> Tuple[Transaction, PortfolioHolding]:
+        """Price, validate and record a buy or sell in one write transaction.
+
+        The current timestep, latest price and existing holding are read under
+        the same write lock that saves the result, so concurrent trades for one
+        holding can't overwrite each other.
+
+        Args:
+            character_name: Character making the trade
+            symbol: Stock symbol
+            transaction_type: BUY or SELL
+            quantity: Number of shares
+
+        Returns:
+            Tuple of (saved Transaction with its id set, holding after the trade).
+            A sell that closes the position returns a holding with quantity 0.
+
+        Raises:
+            LookupError: If the stock has no price
+            ValueError: If a sell exceeds the shares held
+        """
+        with self.get_write_connection() as conn:
             cursor = conn.cursor()
 
-            if holding.quantity > 0:
-                cursor.execute("""
-                    INSERT OR REPLACE INTO portfolios
-                    (character_name, symbol, quantity, avg_purchase_price)
-                    VALUES (?, ?, ?, ?)
-                """, (
-                    holding.character_name,
-                    holding.symbol,
-                    holding.quantity,
-                    holding.avg_purchase_price
-                ))
-                logger.info(
-                    f"Updated portfolio: {holding.character_name} - {holding.symbol}: "
-                    f"{holding.quantity} @ ¢{holding.avg_purchase_price:.2f}"
-                )
+            cursor.execute(_SQL_GET_MARKET_STATE)
+            current_timestep = cursor.fetchone()['current_timestep']
+
+            # Latest prices only change at timestep boundaries, so they are
+            # usually cached already
+            current_price = self._cached_latest_price(symbol)
+            if current_price is None:
+                cursor.execute(_SQL_GET_LATEST_PRICE, (symbol,))
+                price_row = cursor.fetchone()
+                if not price_row:
+                    raise LookupError(f"Stock {symbol} not found")
+                current_price = price_row['price']
+
+            cursor.execute(_SQL_GET_HOLDING, (character_name, symbol))
+            holding_row = cursor.fetchone()
+            held = holding_row['quantity'] if holding_row else 0
+            avg_price = holding_row['avg_purchase_price'] if holding_row else current_price
+
+            total_amount = current_price * quantity
+            if transaction_type == TransactionType.BUY:
+                # Weighted average of the existing cost basis and this purchase
+                new_quantity = held + quantity
+                avg_price = (held * avg_price + total_amount) / new_quantity
             else:
-                # Remove holding if quantity is zero
-                cursor.execute("""
-                    DELETE FROM portfolios
-                    WHERE character_name = ? AND symbol = ?
-                """, (holding.character_name, holding.symbol))
-                logger.info(
-                    f"Removed portfolio holding: {holding.character_name} - {holding.symbol}"
-                )
+                if not holding_row:
+                    raise ValueError(f"No holdings found for {symbol}")
+                if held < quantity:
+                    raise ValueError(f"Insufficient shares. Have {held}, trying to sell {quantity}")
+                new_quantity = held - quantity  # Average price is unchanged by a sale
 
-    # Transaction Methods
+            holding = PortfolioHolding(
+                character_name=character_name,
+                symbol=symbol,
+                quantity=new_quantity,
+                avg_purchase_price=avg_price
+            )
+            transaction = Transaction(
+                id=None,
+                character_name=character_name,
+                symbol=symbol,
+                transaction_type=transaction_type,
+                quantity=quantity,
+                price=current_price,
+                total_amount=total_amount,
+                timestamp=datetime.now(),
+                timestep=current_timestep
+            )
+
+            self._write_holding(cursor, holding)
+            transaction.id = self._insert_transaction(cursor, transaction)
+            return transaction, holding
 
-    def save_transaction(self, transaction: Transaction) -> int:
-        """Save a transaction to the database.
+    def _insert_transaction(self, cursor: sqlite3.Cursor, transaction: Transaction) -> int:
+        """Insert a transaction row.
 
         Args:
+            cursor: Cursor on the write connection
             transaction: Transaction object to save
 
         Returns:
             Transaction ID
         """
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO transactions
-                (character_name, symbol, transaction_type, quantity, price,
-                 total_amount, timestamp, timestep)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                transaction.character_name,
-                transaction.symbol,
-                transaction.transaction_type.value,
-                transaction.quantity,
-                transaction.price,
-                transaction.total_amount,
-                transaction.timestamp.isoformat(),
-                transaction.timestep
-            ))
-            transaction_id = cursor.lastrowid
-            logger.info(
-                f"Transaction saved: {transaction.transaction_type.value} - "
-                f"{transaction.character_name} - {transaction.symbol} - "
-                f"{transaction.quantity} @ ¢{transaction.price:.2f}"
-            )
-            return transaction_id
-
-    def get_transactions(
+        cursor.execute(_SQL_SAVE_TRANSACTION, (
+            transaction.character_name,
+            transaction.symbol,
+            transaction.transaction_type.value,
+            transaction.quantity,
+            transaction.price,
+            transaction.total_amount,
+            datetime_to_us(transaction.timestamp),
+            transaction.timestep
+        ))
+        logger.info(
+            "Transaction saved: %s - %s - %s - %d @ ¢%.2f",
+            transaction.transaction_type.value, transaction.character_name,
+            transaction.symbol, transaction.quantity, transaction.price
+        )
+        return cursor.lastrowid
+
+    def iter_transaction_rows(
         self,
         character_name: Optional[str] = None,
         symbol: Optional[str] = None,
         limit: Optional[int] = None
-    ) -> List[Transaction]:
-        """Get transactions with optional filters.
+    ) -> Iterator[dict]:
+        """Yield transactions as response-ready dictionaries.
+
+        Rows read back from the database already passed Transaction validation
+        when they were written, so this skips building Transaction objects for
+        callers that only serialize them.
 
         Args:
             character_name: Filter by character (optional)
             symbol: Filter by stock symbol (optional)
             limit: Maximum number of transactions to return (optional)
 
-        Returns:
-            List of Transaction objects, ordered by timestamp descending
+        Yields:
+            {id, character_name, symbol, type, quantity, price, total_amount,
+            timestamp, timestep} dictionaries, ordered by timestamp descending
         """
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-
-            query = "SELECT * FROM transactions WHERE 1=1"
-            params = []
-
-            if character_name:
-                query += " AND character_name = ?"
-                params.append(character_name)
-
-            if symbol:
-                query += " AND symbol = ?"
-                params.append(symbol)
-
-            query += " ORDER BY timestamp DESC"
+            cursor = self._query_transactions(conn, character_name, symbol, limit)
+            for (
+                transaction_id, character_name, symbol, transaction_type, quantity,
+                price, total_amount, timestamp, timestep
+            ) in cursor:
+                yield {
+                    "id": transaction_id,
+                    "character_name": character_name,
+                    "symbol": symbol,
+                    "type": transaction_type,
+                    "quantity": quantity,
+                    "price": price,
+                    "total_amount": total_amount,
+                    "timestamp": timestamp,
+                    "timestep": timestep
+                }
+
+    def _query_transactions(
+        self,
+        conn: sqlite3.Connection,
+        character_name: Optional[str],
+        symbol: Optional[str],
+        limit: Optional[int]
+    ) -> sqlite3.Cursor:
+        """Run the filtered transactions query.
 
-            if limit:
-                query += " LIMIT ?"
-                params.append(limit)
+        Args:
+            conn: Read connection
+            character_name: Filter by character (optional)
+            symbol: Filter by stock symbol (optional)
+            limit: Maximum number of transactions to return (optional)
 
-            cursor.execute(query, params)
+        Returns:
+            Cursor over plain transaction tuples, newest first
+        """
+        cursor = conn.cursor()
+        cursor.row_factory = None  # Plain tuples, unpacked positionally by callers
 
-            return [
-                Transaction(
-                    id=row['id'],
-                    character_name=row['character_name'],
-                    symbol=row['symbol'],
-                    transaction_type=TransactionType(row['transaction_type']),
-                    quantity=row['quantity'],
-                    price=row['price'],
-                    total_amount=row['total_amount'],
-                    timestamp=datetime.fromisoformat(row['timestamp']),
-                    timestep=row['timestep']
-                )
-                for row in cursor.fetchall()
-            ]
+        # Empty filters (None, "" or 0) are ignored
+        query = _SQL_GET_TRANSACTIONS[(bool(character_name), bool(symbol), bool(limit))]
+        params = [p for p in (character_name, symbol, limit) if p]
+        cursor.execute(query, params)
+        return cursor
 
     # Market State Methods
 
@@ -454,17 +1213,13 @@ class Database:
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT current_timestep, last_updated, is_generating
-                FROM market_state
-                WHERE id = 1
-            """)
+            cursor.execute(_SQL_GET_MARKET_STATE)
 
             row = cursor.fetchone()
             return MarketState(
                 current_timestep=row['current_timestep'],
-                last_updated=datetime.fromisoformat(row['last_updated']),
-                is_generating=bool(row['is_generating'])
+                last_updated=row['last_updated'],
+                is_generating=row['is_generating']
             )
 
     def update_market_state(self, market_state: MarketState):
@@ -473,36 +1228,94 @@ class Database:
         Args:
             market_state: MarketState object to save
         """
-        with self.get_connection() as conn:
+        with self.get_write_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE market_state
-                SET current_timestep = ?, last_updated = ?, is_generating = ?
-                WHERE id = 1
-            """, (
+            cursor.execute(_SQL_UPDATE_MARKET_STATE, (
                 market_state.current_timestep,
-                market_state.last_updated.isoformat(),
+                datetime_to_us(market_state.last_updated),
                 1 if market_state.is_generating else 0
             ))
             logger.info(
-                f"Market state updated: timestep={market_state.current_timestep}, "
-                f"is_generating={market_state.is_generating}"
+                "Market state updated: timestep=%d, is_generating=%s",
+                market_state.current_timestep, market_state.is_generating
             )
 
+    def finalize_timestep(self, stock_prices: List[StockPrice], market_state: MarketState):
+        """Save a timestep's prices, advance the market state and release the
+        generation lock, all in one transaction.
+
+        The lock is released by the same market_state UPDATE that records the
+        new timestep, so market_state.is_generating is set to False. Prices
+        and market state share the prices database file, so the commit is
+        atomic even with WAL.
+
+        Args:
+            stock_prices: StockPrice objects for the new timestep
+            market_state: Market state with the new timestep and update time
+        """
+        market_state.is_generating = False
+        self.save_stock_prices(stock_prices, market_state)
+        logger.debug("Generation lock released with timestep %d", market_state.current_timestep)
+
+    def clear_market_data(self) -> Tuple[int, int, int]:
+        """Delete all prices, transactions and holdings and reset the market
+        state to timestep 0.
+
+        The price cache is invalidated before the write lock is released, so
+        a trade can't fill at a cached price that was just deleted.
+
+        Returns:
+            Tuple of (deleted prices, deleted transactions, deleted holdings)
+        """
+        with self._write_lock:
+            try:
+                with self.get_write_connection() as conn:
+                    cursor = conn.cursor()
+
+                    cursor.execute("DELETE FROM prices.stock_prices")
+                    deleted_prices = cursor.rowcount
+
+                    cursor.execute("DELETE FROM transactions")
+                    deleted_transactions = cursor.rowcount
+
+                    cursor.execute("DELETE FROM portfolios")
+                    deleted_holdings = cursor.rowcount
+
+                    cursor.execute(
+                        "UPDATE prices.market_state SET current_timestep = 0, last_updated_us = ?",
+                        (datetime_to_us(datetime.now()),)
+                    )
+            finally:
+                # Also on rollback, in case an in-memory reader cached the
+                # uncommitted deletes (see save_stock_prices)
+                self.invalidate_price_cache()
+
+        return deleted_prices, deleted_transactions, deleted_holdings
+
     def set_generation_lock(self, is_locked: bool):
         """Set the generation lock flag.
 
         Args:
             is_locked: True to lock, False to unlock
         """
-        with self.get_connection() as conn:
+        with self.get_write_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE market_state
-                SET is_generating = ?
-                WHERE id = 1
-            """, (1 if is_locked else 0,))
-            logger.debug(f"Generation lock {'acquired' if is_locked else 'released'}")
+            cursor.execute(_SQL_SET_GENERATION_LOCK, (1 if is_locked else 0,))
+            logger.debug("Generation lock %s", "acquired" if is_locked else "released")
+
+    def try_acquire_generation_lock(self) -> bool:
+        """Take the generation lock if nobody holds it.
+
+        The check and the set are one UPDATE, so two callers can't both
+        see the lock free and both take it.
+
+        Returns:
+            True if the lock was acquired, False if it was already held
+        """
+        with self.get_write_connection() as conn:
+            acquired = conn.execute(_SQL_TRY_ACQUIRE_GENERATION_LOCK).rowcount == 1
+            logger.debug("Generation lock %s", "acquired" if acquired else "busy")
+            return acquired
 
     def is_generation_locked(self) -> bool:
         """Check if timestep generation is currently locked.
@@ -510,5 +1323,7 @@ class Database:
         Returns:
             True if locked, False otherwise
         """
-        market_state = self.get_market_state()
-        return market_state.is_generating
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_IS_GENERATION_LOCKED)
+            return cursor.fetchone()[0]
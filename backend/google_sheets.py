@@ -3,12 +3,15 @@ Google Sheets integration for GalacticStocks.
 Loads company parameters and GM price overrides from a Google Sheet.
 """
 import logging
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
 import os
 import json
+import time
 from pathlib import Path
 
+import numpy as np
+
 try:
     from google.oauth2.service_account import Credentials
     from googleapiclient.discovery import build
@@ -20,6 +23,12 @@ from models import Company, PriceOverride
 
 logger = logging.getLogger(__name__)
 
+COMPANIES_RANGE = 'Companies!A2:E'  # Skip header row
+OVERRIDES_RANGE = 'Overrides!A2:C'  # Skip header row
+
+# How long fetched sheet values are reused (seconds, 0 disables caching)
+CACHE_TTL_SECONDS = float(os.getenv("GOOGLE_SHEETS_CACHE_TTL", "60"))
+
 
 class GoogleSheetsClient:
     """Client for reading market data from Google Sheets."""
@@ -38,6 +47,13 @@ class GoogleSheetsClient:
         Raises:
             ValueError: If Google Sheets libraries are not installed
         """
+        self._values_cache: Optional[Tuple[list, list]] = None
+        self._values_cache_time = 0.0
+        # Companies parsed from the cached rows, as (rows, companies)
+        self._companies_cache: Optional[Tuple[list, List[Company]]] = None
+        # Revision token for the cached rows, as (rows, revision)
+        self._revision_cache: Optional[Tuple[list, tuple]] = None
+
         if not GOOGLE_SHEETS_AVAILABLE:
             logger.warning(
                 "Google Sheets libraries not available. "
@@ -80,6 +96,53 @@ class GoogleSheetsClient:
         """
         return self.service is not None
 
+    def invalidate_cache(self):
+        """Drop the cached sheet values, so the next load reads the sheet.
+
+        Admin actions call this so a timestep never runs on overrides or
+        company rows that are up to CACHE_TTL_SECONDS old.
+        """
+        self._values_cache = None
+
+    def _get_sheet_values(self) -> Tuple[list, list]:
+        """Fetch the Companies and Overrides rows in a single batchGet request.
+
+        Results are reused for CACHE_TTL_SECONDS, so loading companies and then
+        overrides during one timestep costs one round trip. If the batch fails
+        (e.g. the Overrides sheet is missing), Companies is fetched on its own.
+
+        Returns:
+            Tuple of (company rows, override rows)
+
+        Raises:
+            Exception: If the Companies sheet cannot be read
+        """
+        now = time.monotonic()
+        if self._values_cache is not None and now - self._values_cache_time < CACHE_TTL_SECONDS:
+            return self._values_cache
+
+        values = self.service.spreadsheets().values()
+        try:
+            result = values.batchGet(
+                spreadsheetId=self.spreadsheet_id,
+                ranges=[COMPANIES_RANGE, OVERRIDES_RANGE]
+            ).execute()
+            value_ranges = result.get('valueRanges', [])
+            companies_values = value_ranges[0].get('values', []) if value_ranges else []
+            overrides_values = value_ranges[1].get('values', []) if len(value_ranges) > 1 else []
+        except Exception as e:
+            logger.warning(f"Batch read of Google Sheet failed ({e}), reading Companies only")
+            result = values.get(
+                spreadsheetId=self.spreadsheet_id,
+                range=COMPANIES_RANGE
+            ).execute()
+            companies_values = result.get('values', [])
+            overrides_values = []
+
+        self._values_cache = (companies_values, overrides_values)
+        self._values_cache_time = now
+        return self._values_cache
+
     def load_companies(self) -> List[Company]:
         """Load company data from the Companies sheet.
 
@@ -99,54 +162,129 @@ class GoogleSheetsClient:
             return []
 
         try:
-            # Read the Companies sheet
-            sheet_range = 'Companies!A2:E'  # Skip header row
-            result = self.service.spreadsheets().values().get(
-                spreadsheetId=self.spreadsheet_id,
-                range=sheet_range
-            ).execute()
-
-            values = result.get('values', [])
+            values, _ = self._get_sheet_values()
 
             if not values:
                 logger.warning("No company data found in Google Sheet")
                 return []
 
-            companies = []
-            for i, row in enumerate(values, start=2):  # Start at 2 for row number
-                try:
-                    # Handle rows with missing columns
-                    if len(row) < 5:
-                        logger.warning(f"Row {i} has insufficient columns, skipping")
-                        continue
-
-                    symbol = row[0].strip()
-                    name = row[1].strip()
-                    initial_price = float(row[2])
-                    trend = float(row[3])
-                    volatility = float(row[4])
-
-                    company = Company(
-                        symbol=symbol,
-                        name=name,
-                        initial_price=initial_price,
-                        trend=trend,
-                        volatility=volatility
-                    )
-                    companies.append(company)
-                    logger.debug(f"Loaded company: {symbol} - {name}")
+            # Same rows as last time (still within the cache TTL): reuse the parse
+            cached = self._companies_cache
+            if cached is not None and cached[0] is values:
+                return list(cached[1])
 
-                except (ValueError, IndexError) as e:
-                    logger.error(f"Error parsing row {i}: {e}, skipping")
+            # Handle rows with missing columns
+            rows = []
+            for i, row in enumerate(values, start=2):  # Start at 2 for row number
+                if len(row) < 5:
+                    logger.warning(f"Row {i} has insufficient columns, skipping")
                     continue
+                rows.append((i, row))
+
+            try:
+                companies = self._parse_company_table([row for _, row in rows])
+            except ValueError:
+                # Some row is invalid; parse one at a time to skip only the bad rows
+                companies = self._parse_company_rows(rows)
 
+            self._companies_cache = (values, companies)
             logger.info(f"Loaded {len(companies)} companies from Google Sheet")
-            return companies
+            return list(companies)
 
         except Exception as e:
             logger.error(f"Failed to load companies from Google Sheet: {e}")
             raise
 
+    def companies_revision(self) -> Optional[tuple]:
+        """Get a revision token for the Companies sheet.
+
+        Tokens compare equal exactly when the company rows are the same, so
+        callers can skip rebuilding state from an unchanged sheet. Uses the
+        cached sheet values, so this costs no extra request within the TTL.
+
+        Returns:
+            Revision token, or None if the sheet can't be read
+        """
+        if not self.service:
+            return None
+
+        try:
+            values, _ = self._get_sheet_values()
+        except Exception as e:
+            logger.warning(f"Could not read Companies sheet revision: {e}")
+            return None
+
+        cached = self._revision_cache
+        if cached is not None and cached[0] is values:
+            return cached[1]
+
+        revision = tuple(tuple(row) for row in values)
+        self._revision_cache = (values, revision)
+        return revision
+
+    def _parse_company_table(self, rows: List[list]) -> List[Company]:
+        """Parse company rows with the numeric columns converted in one pass.
+
+        Args:
+            rows: Sheet rows with at least five columns
+
+        Returns:
+            List of Company objects
+
+        Raises:
+            ValueError: If any row has a non-numeric or invalid value
+        """
+        if not rows:
+            return []
+
+        table = np.array([row[:5] for row in rows], dtype=object)
+        numbers = table[:, 2:5].astype(np.float64).tolist()  # tolist() gives Python floats
+        return [
+            Company(
+                symbol=symbol.strip(),
+                name=name.strip(),
+                initial_price=initial_price,
+                trend=trend,
+                volatility=volatility
+            )
+            for symbol, name, (initial_price, trend, volatility)
+            in zip(table[:, 0], table[:, 1], numbers)
+        ]
+
+    def _parse_company_rows(self, rows: List[Tuple[int, list]]) -> List[Company]:
+        """Parse company rows one at a time, skipping rows that fail.
+
+        Args:
+            rows: (sheet row number, row) pairs with at least five columns
+
+        Returns:
+            List of Company objects
+        """
+        companies = []
+        for i, row in rows:
+            try:
+                symbol = row[0].strip()
+                name = row[1].strip()
+                initial_price = float(row[2])
+                trend = float(row[3])
+                volatility = float(row[4])
+
+                company = Company(
+                    symbol=symbol,
+                    name=name,
+                    initial_price=initial_price,
+                    trend=trend,
+                    volatility=volatility
+                )
+                companies.append(company)
+                logger.debug(f"Loaded company: {symbol} - {name}")
+
+            except (ValueError, IndexError) as e:
+                logger.error(f"Error parsing row {i}: {e}, skipping")
+                continue
+
+        return companies
+
     def load_price_overrides(self) -> List[PriceOverride]:
         """Load GM price overrides from the Overrides sheet.
 
@@ -166,19 +304,13 @@ class GoogleSheetsClient:
             return []
 
         try:
-            # Read the Overrides sheet
-            sheet_range = 'Overrides!A2:C'  # Skip header row
-            result = self.service.spreadsheets().values().get(
-                spreadsheetId=self.spreadsheet_id,
-                range=sheet_range
-            ).execute()
-
-            values = result.get('values', [])
+            _, values = self._get_sheet_values()
 
             if not values:
                 logger.debug("No price overrides found in Google Sheet")
                 return []
 
+            now = datetime.now()
             overrides = []
             for i, row in enumerate(values, start=2):  # Start at 2 for row number
                 try:
@@ -194,9 +326,9 @@ class GoogleSheetsClient:
                         try:
                             timestamp = datetime.fromisoformat(row[2].strip())
                         except ValueError:
-                            timestamp = datetime.now()
+                            timestamp = now
                     else:
-                        timestamp = datetime.now()
+                        timestamp = now
 
                     override = PriceOverride(
                         symbol=symbol,
@@ -222,22 +354,41 @@ class GoogleSheetsClient:
 class MockGoogleSheetsClient(GoogleSheetsClient):
     """Mock client for development/testing without Google Sheets."""
 
-    def __init__(self):
-        """Initialize mock client with sample data."""
+    def __init__(self, db=None):
+        """Initialize mock client with sample data.
+
+        Args:
+            db: Database to read companies from (optional, falls back to companies.json)
+        """
         # Don't call super().__init__() to avoid needing credentials
         self.service = "mock"
+        self.db = db
         logger.info("Using mock Google Sheets client with sample data")
 
     def is_available(self) -> bool:
         """Mock is always available."""
         return True
 
+    def invalidate_cache(self):
+        """Mock data isn't cached, so there is nothing to drop."""
+
+    def companies_revision(self) -> Optional[tuple]:
+        """Mock data has no revision, so callers always reload.
+
+        Returns:
+            None
+        """
+        return None
+
     def load_companies(self) -> List[Company]:
-        """Load company data from companies.json file.
+        """Load company data from the database, or companies.json without one.
 
         Returns:
-            List of Company objects from companies.json
+            List of Company objects
         """
+        if self.db is not None:
+            return self.db.get_companies()
+
         try:
             # Get the path to companies.json relative to this file
             backend_dir = Path(__file__).parent
@@ -247,7 +398,7 @@ class MockGoogleSheetsClient(GoogleSheetsClient):
                 logger.error(f"companies.json not found at {companies_file}")
                 return []
 
-            with open(companies_file, 'r') as f:
+            with open(companies_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
 
             companies = []
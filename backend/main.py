@@ -2,21 +2,28 @@
 FastAPI server for GalacticStocks.
 Provides REST API endpoints and WebSocket support for real-time updates.
 """
+import asyncio
 import logging
-from datetime import datetime
-from typing import Optional, List
-from contextlib import asynccontextmanager
+import os
+import sys
+from itertools import chain
+from typing import Iterator, Optional, List, Set
+from contextlib import asynccontextmanager, suppress
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, HTTPException, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
+import anyio
+import numpy as np
+import orjson
 import uvicorn
 
 from database import Database
 from stock_simulator import StockMarket
 from google_sheets import GoogleSheetsClient, MockGoogleSheetsClient
-from models import TransactionType, PortfolioHolding, Transaction
-from admin_routes import router as admin_router
+from models import TransactionType
+from admin_routes import router as admin_router, body_schema, json_body
 import admin_routes
 
 # Configure logging
@@ -26,6 +33,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Every Nth timestep is broadcast in full instead of as a price delta, so
+# clients that somehow drifted resync without a reconnect
+FULL_BROADCAST_INTERVAL = 10
+
 # Global instances
 db: Optional[Database] = None
 market: Optional[StockMarket] = None
@@ -37,7 +48,9 @@ class ConnectionManager:
 
     def __init__(self):
         """Initialize connection manager."""
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
+        # Messages waiting for run_broadcaster()
+        self._outbox: asyncio.Queue = asyncio.Queue()
         logger.info("WebSocket ConnectionManager initialized")
 
     async def connect(self, websocket: WebSocket):
@@ -47,8 +60,8 @@ class ConnectionManager:
             websocket: WebSocket connection to register
         """
         await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
+        self.active_connections.add(websocket)
+        logger.info("WebSocket connected. Total connections: %d", len(self.active_connections))
 
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection.
@@ -57,8 +70,8 @@ class ConnectionManager:
             websocket: WebSocket connection to remove
         """
         if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
+            self.active_connections.discard(websocket)
+            logger.info("WebSocket disconnected. Total connections: %d", len(self.active_connections))
 
     async def broadcast(self, message: dict):
         """Broadcast a message to all connected clients.
@@ -66,12 +79,21 @@ class ConnectionManager:
         Args:
             message: Dictionary to send as JSON
         """
+        # Encode once for all clients; sent as a text frame since the frontend
+        # JSON.parses event.data
+        payload = orjson.dumps(message).decode()
+
+        # Send to every client concurrently so one slow client doesn't delay the rest
+        connections = list(self.active_connections)
+        results = await asyncio.gather(
+            *(connection.send_text(payload) for connection in connections),
+            return_exceptions=True
+        )
+
         disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error sending to WebSocket: {e}")
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error("Error sending to WebSocket: %s", result)
                 disconnected.append(connection)
 
         # Clean up disconnected clients
@@ -79,10 +101,29 @@ class ConnectionManager:
             self.disconnect(connection)
 
         if disconnected:
-            logger.info(f"Cleaned up {len(disconnected)} disconnected WebSocket(s)")
+            logger.info("Cleaned up %d disconnected WebSocket(s)", len(disconnected))
+
+    def enqueue(self, message: dict):
+        """Queue a message for broadcast without waiting for it to be sent.
+
+        Args:
+            message: Dictionary to send as JSON
+        """
+        self._outbox.put_nowait(message)
+
+    async def run_broadcaster(self):
+        """Broadcast queued messages in order until cancelled."""
+        while True:
+            message = await self._outbox.get()
+            try:
+                await self.broadcast(message)
+            except Exception as e:
+                logger.error(f"Error broadcasting WebSocket message: {e}")
 
 
 # Pydantic models for API requests/responses
+# The GET endpoints return their JSON responses directly, so their response
+# models only document the schema and are not re-validated per request.
 
 class BuyRequest(BaseModel):
     """Request to buy stock."""
@@ -144,22 +185,22 @@ async def lifespan(app: FastAPI):
 
     # Initialize database with path that supports Railway volumes
     # Use /app/data if it exists (Railway volume), otherwise local directory
-    import os
     db_dir = "/app/data" if os.path.exists("/app/data") else "."
     db_path = os.path.join(db_dir, "galactic_market.db")
     logger.info(f"Using database path: {db_path}")
 
     db = Database(db_path)
+    admin_routes.migrate_companies(db)
 
     # Initialize Google Sheets client (or mock)
     try:
         sheets_client = GoogleSheetsClient()
         if not sheets_client.is_available():
             logger.warning("Google Sheets not available, using mock client")
-            sheets_client = MockGoogleSheetsClient()
+            sheets_client = MockGoogleSheetsClient(db)
     except Exception as e:
         logger.warning(f"Failed to initialize Google Sheets client: {e}, using mock")
-        sheets_client = MockGoogleSheetsClient()
+        sheets_client = MockGoogleSheetsClient(db)
 
     # Initialize market
     market = StockMarket(db, sheets_client)
@@ -185,8 +226,9 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error during market initialization: {e}")
 
-    # Initialize WebSocket manager
+    # Initialize WebSocket manager; one background task sends all broadcasts
     websocket_manager = ConnectionManager()
+    app.state.broadcast_task = asyncio.create_task(websocket_manager.run_broadcaster())
 
     logger.info("GalacticStocks server started successfully")
 
@@ -194,6 +236,10 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down GalacticStocks server...")
+    app.state.broadcast_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await app.state.broadcast_task
+    db.close()
 
 
 # Create FastAPI app
@@ -201,6 +247,7 @@ app = FastAPI(
     title="GalacticStocks API",
     description="D&D Campaign Stock Market Simulator",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -250,8 +297,8 @@ async def get_market():
         Current market snapshot
     """
     try:
-        snapshot = market.get_market_snapshot()
-        return MarketResponse(**snapshot)
+        payload = await anyio.to_thread.run_sync(market.get_market_snapshot_bytes)
+        return Response(content=payload, media_type="application/json")
     except Exception as e:
         logger.error(f"Error getting market data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -269,17 +316,9 @@ async def get_price_history(symbol: str, limit: Optional[int] = None):
         Price history data
     """
     try:
-        history = market.get_price_history(symbol, limit)
-        history_data = [
-            {
-                "timestep": p.timestep,
-                "price": p.price,
-                "timestamp": p.timestamp.isoformat(),
-                "is_override": p.is_override
-            }
-            for p in history
-        ]
-        return PriceHistoryResponse(symbol=symbol, history=history_data)
+        # Rows arrive in response shape; orjson encodes the datetimes as ISO 8601
+        history_data = await anyio.to_thread.run_sync(db.get_price_history_rows, symbol, limit)
+        return ORJSONResponse({"symbol": symbol, "history": history_data})
     except Exception as e:
         logger.error(f"Error getting price history for {symbol}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -296,43 +335,57 @@ async def get_portfolio(character_name: str):
         Portfolio data with holdings and P/L
     """
     try:
-        portfolio = db.get_portfolio(character_name)
-
-        # Get current prices for holdings
-        current_prices = market.get_current_prices()
-
-        holdings_data = []
-        for holding in portfolio.holdings:
-            current_price = current_prices.get(holding.symbol, holding.avg_purchase_price)
-            current_value = holding.calculate_current_value(current_price)
-            profit_loss = holding.calculate_profit_loss(current_price)
+        # Holdings come back with their current prices from the same query
+        portfolio = await anyio.to_thread.run_sync(db.get_portfolio, character_name)
+
+        # Value every holding at once
+        holdings = portfolio.holdings
+        quantities = np.fromiter((h.quantity for h in holdings), dtype=np.float64, count=len(holdings))
+        avg_prices = np.fromiter((h.avg_purchase_price for h in holdings), dtype=np.float64, count=len(holdings))
+        prices = np.array(portfolio.current_prices, dtype=np.float64)
+        current_values = quantities * prices
+        profit_losses = (prices - avg_prices) * quantities
+        cost_bases = quantities * avg_prices
+        percentages = np.divide(
+            profit_losses * 100, cost_bases, out=np.zeros_like(cost_bases), where=cost_bases > 0
+        )
 
-            holdings_data.append({
+        # tolist() gives Python floats for the JSON encoder
+        holdings_data = [
+            {
                 "symbol": holding.symbol,
                 "quantity": holding.quantity,
                 "avg_purchase_price": holding.avg_purchase_price,
                 "current_price": current_price,
                 "current_value": current_value,
                 "profit_loss": profit_loss,
-                "profit_loss_percentage": (profit_loss / holding.total_cost_basis * 100)
-                if holding.total_cost_basis > 0 else 0
-            })
-
-        return PortfolioResponse(
-            character_name=portfolio.character_name,
-            holdings=holdings_data,
-            total_value=portfolio.total_value,
-            total_cost_basis=portfolio.total_cost_basis,
-            total_profit_loss=portfolio.total_profit_loss,
-            profit_loss_percentage=portfolio.profit_loss_percentage
-        )
+                "profit_loss_percentage": percentage
+            }
+            for holding, current_price, current_value, profit_loss, percentage in zip(
+                holdings, prices.tolist(), current_values.tolist(),
+                profit_losses.tolist(), percentages.tolist()
+            )
+        ]
+
+        return ORJSONResponse({
+            "character_name": portfolio.character_name,
+            "holdings": holdings_data,
+            "total_value": portfolio.total_value,
+            "total_cost_basis": portfolio.total_cost_basis,
+            "total_profit_loss": portfolio.total_profit_loss,
+            "profit_loss_percentage": portfolio.profit_loss_percentage
+        })
     except Exception as e:
         logger.error(f"Error getting portfolio for {character_name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/transaction/buy", response_model=TransactionResponse)
-async def buy_stock(request: BuyRequest):
+@app.post(
+    "/api/transaction/buy",
+    response_model=TransactionResponse,
+    openapi_extra=body_schema(BuyRequest)
+)
+async def buy_stock(request: BuyRequest = Depends(json_body(BuyRequest))):
     """Buy stock for a character.
 
     Args:
@@ -342,72 +395,21 @@ async def buy_stock(request: BuyRequest):
         Transaction result
     """
     try:
-        # Get current market state
-        market_state = db.get_market_state()
-        current_timestep = market_state.current_timestep
-
-        # Get current price
-        current_price_obj = db.get_latest_price(request.symbol)
-        if not current_price_obj:
-            raise HTTPException(status_code=404, detail=f"Stock {request.symbol} not found")
-
-        current_price = current_price_obj.price
-        total_cost = current_price * request.quantity
-
-        logger.info(
-            f"Processing BUY: {request.character_name} - {request.symbol} - "
-            f"{request.quantity} @ ¢{current_price:.2f} = ¢{total_cost:.2f}"
+        # Price lookup, cost-basis update and transaction record in one write transaction
+        transaction, new_holding = await anyio.to_thread.run_sync(
+            db.execute_trade, request.character_name, request.symbol, TransactionType.BUY, request.quantity
         )
 
-        # Get existing holding or create new one
-        existing_holding = db.get_holding(request.character_name, request.symbol)
-
-        if existing_holding:
-            # Update average purchase price
-            total_quantity = existing_holding.quantity + request.quantity
-            total_cost_basis = (
-                existing_holding.total_cost_basis + total_cost
-            )
-            new_avg_price = total_cost_basis / total_quantity
-
-            new_holding = PortfolioHolding(
-                character_name=request.character_name,
-                symbol=request.symbol,
-                quantity=total_quantity,
-                avg_purchase_price=new_avg_price
-            )
-        else:
-            # Create new holding
-            new_holding = PortfolioHolding(
-                character_name=request.character_name,
-                symbol=request.symbol,
-                quantity=request.quantity,
-                avg_purchase_price=current_price
-            )
-
-        # Save holding
-        db.update_portfolio(new_holding)
-
-        # Create transaction record
-        transaction = Transaction(
-            id=None,
-            character_name=request.character_name,
-            symbol=request.symbol,
-            transaction_type=TransactionType.BUY,
-            quantity=request.quantity,
-            price=current_price,
-            total_amount=total_cost,
-            timestamp=datetime.now(),
-            timestep=current_timestep
+        logger.info(
+            "BUY transaction completed: ID=%d - %s - %s - %d @ ¢%.2f = ¢%.2f",
+            transaction.id, request.character_name, request.symbol, request.quantity,
+            transaction.price, transaction.total_amount
         )
-        transaction_id = db.save_transaction(transaction)
-
-        logger.info(f"BUY transaction completed: ID={transaction_id}")
 
         return TransactionResponse(
             success=True,
-            transaction_id=transaction_id,
-            message=f"Bought {request.quantity} shares of {request.symbol} for ¢{total_cost:.2f}",
+            transaction_id=transaction.id,
+            message=f"Bought {request.quantity} shares of {request.symbol} for ¢{transaction.total_amount:.2f}",
             new_holding={
                 "symbol": new_holding.symbol,
                 "quantity": new_holding.quantity,
@@ -415,15 +417,19 @@ async def buy_stock(request: BuyRequest):
             }
         )
 
-    except HTTPException:
-        raise
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing buy transaction: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/transaction/sell", response_model=TransactionResponse)
-async def sell_stock(request: SellRequest):
+@app.post(
+    "/api/transaction/sell",
+    response_model=TransactionResponse,
+    openapi_extra=body_schema(SellRequest)
+)
+async def sell_stock(request: SellRequest = Depends(json_body(SellRequest))):
     """Sell stock for a character.
 
     Args:
@@ -433,84 +439,37 @@ async def sell_stock(request: SellRequest):
         Transaction result
     """
     try:
-        # Get current market state
-        market_state = db.get_market_state()
-        current_timestep = market_state.current_timestep
-
-        # Get current price
-        current_price_obj = db.get_latest_price(request.symbol)
-        if not current_price_obj:
-            raise HTTPException(status_code=404, detail=f"Stock {request.symbol} not found")
-
-        current_price = current_price_obj.price
-
-        # Get existing holding
-        existing_holding = db.get_holding(request.character_name, request.symbol)
-
-        if not existing_holding:
-            raise HTTPException(
-                status_code=400,
-                detail=f"No holdings found for {request.symbol}"
-            )
-
-        if existing_holding.quantity < request.quantity:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Insufficient shares. Have {existing_holding.quantity}, trying to sell {request.quantity}"
-            )
-
-        total_proceeds = current_price * request.quantity
-        realized_profit_loss = (current_price - existing_holding.avg_purchase_price) * request.quantity
-
-        logger.info(
-            f"Processing SELL: {request.character_name} - {request.symbol} - "
-            f"{request.quantity} @ ¢{current_price:.2f} = ¢{total_proceeds:.2f} "
-            f"(P/L: ¢{realized_profit_loss:+.2f})"
+        # Price lookup, share check, holding update and transaction record in one write transaction
+        transaction, new_holding = await anyio.to_thread.run_sync(
+            db.execute_trade, request.character_name, request.symbol, TransactionType.SELL, request.quantity
         )
 
-        # Update holding
-        new_quantity = existing_holding.quantity - request.quantity
+        total_proceeds = transaction.total_amount
+        realized_profit_loss = (transaction.price - new_holding.avg_purchase_price) * request.quantity
 
-        new_holding = PortfolioHolding(
-            character_name=request.character_name,
-            symbol=request.symbol,
-            quantity=new_quantity,
-            avg_purchase_price=existing_holding.avg_purchase_price  # Keep same avg price
-        )
-
-        # Save updated holding (will delete if quantity is 0)
-        db.update_portfolio(new_holding)
-
-        # Create transaction record
-        transaction = Transaction(
-            id=None,
-            character_name=request.character_name,
-            symbol=request.symbol,
-            transaction_type=TransactionType.SELL,
-            quantity=request.quantity,
-            price=current_price,
-            total_amount=total_proceeds,
-            timestamp=datetime.now(),
-            timestep=current_timestep
+        logger.info(
+            "SELL transaction completed: ID=%d - %s - %s - %d @ ¢%.2f = ¢%.2f (P/L: ¢%+.2f)",
+            transaction.id, request.character_name, request.symbol, request.quantity,
+            transaction.price, total_proceeds, realized_profit_loss
         )
-        transaction_id = db.save_transaction(transaction)
-
-        logger.info(f"SELL transaction completed: ID={transaction_id}")
 
         return TransactionResponse(
             success=True,
-            transaction_id=transaction_id,
+            transaction_id=transaction.id,
             message=f"Sold {request.quantity} shares of {request.symbol} for ¢{total_proceeds:.2f} "
                     f"(Realized P/L: ¢{realized_profit_loss:+.2f})",
             new_holding={
                 "symbol": new_holding.symbol,
                 "quantity": new_holding.quantity,
                 "avg_purchase_price": new_holding.avg_purchase_price
-            } if new_quantity > 0 else None
+            } if new_holding.quantity > 0 else None
         )
 
-    except HTTPException:
-        raise
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        # No holding, or not enough shares to sell
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing sell transaction: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -528,27 +487,48 @@ async def generate_timestep():
     try:
         logger.info("Admin: Generating new timestep")
 
-        # Generate new timestep
-        new_state = market.generate_timestep()
+        # Prices clients currently hold, to diff the new ones against
+        previous_prices = (await anyio.to_thread.run_sync(market.get_market_snapshot))["prices"]
+
+        # Generate new timestep from the sheet as it is now, not as cached
+        market.sheets_client.invalidate_cache()
+        new_state = await anyio.to_thread.run_sync(market.generate_timestep)
 
         # Get updated prices
-        snapshot = market.get_market_snapshot()
+        snapshot = await anyio.to_thread.run_sync(market.get_market_snapshot)
+        prices = snapshot["prices"]
+
+        # Broadcast only the prices that changed, unless a symbol was removed
+        # (a delta can't express that) or a periodic full update is due
+        if (
+            new_state.current_timestep % FULL_BROADCAST_INTERVAL == 0
+            or not previous_prices.keys() <= prices.keys()
+        ):
+            message_type = "timestep_updated"
+            broadcast_prices = prices
+        else:
+            message_type = "timestep_delta"
+            broadcast_prices = {
+                symbol: price
+                for symbol, price in prices.items()
+                if previous_prices.get(symbol) != price
+            }
 
-        # Broadcast update to all WebSocket clients
-        await websocket_manager.broadcast({
-            "type": "timestep_updated",
+        # Sent by the background broadcaster, so slow clients don't delay this response
+        websocket_manager.enqueue({
+            "type": message_type,
             "timestep": new_state.current_timestep,
-            "prices": snapshot["prices"],
+            "prices": broadcast_prices,
             "timestamp": new_state.last_updated.isoformat()
         })
 
-        logger.info(f"Timestep {new_state.current_timestep} generated and broadcast")
+        logger.info(f"Timestep {new_state.current_timestep} generated and queued for broadcast")
 
         return {
             "success": True,
             "timestep": new_state.current_timestep,
             "last_updated": new_state.last_updated.isoformat(),
-            "prices": snapshot["prices"]
+            "prices": prices
         }
 
     except RuntimeError as e:
@@ -559,6 +539,35 @@ async def generate_timestep():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _stream_transactions(rows: Iterator[dict], batch_size: int = 256):
+    """Encode transaction rows as a {"transactions": [...], "count": n} JSON object.
+
+    Rows are encoded as they are read and sent in batches, so the full list is
+    never held in memory. The count comes last since it is only known once the
+    rows run out.
+
+    Args:
+        rows: Transaction dictionaries to encode
+        batch_size: Number of rows per chunk
+
+    Yields:
+        Chunks of the response body
+    """
+    yield b'{"transactions":['
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(orjson.dumps(row))  # orjson encodes datetimes as ISO 8601
+        if len(batch) == batch_size:
+            yield (b',' if count else b'') + b','.join(batch)
+            count += len(batch)
+            batch.clear()
+    if batch:
+        yield (b',' if count else b'') + b','.join(batch)
+        count += len(batch)
+    yield b'],"count":%d}' % count
+
+
 @app.get("/api/admin/transactions")
 async def get_all_transactions(
     character_name: Optional[str] = None,
@@ -573,35 +582,21 @@ async def get_all_transactions(
         limit: Maximum number of transactions to return
 
     Returns:
-        List of transactions
+        Streamed list of transactions with their count
     """
     try:
-        transactions = db.get_transactions(character_name, symbol, limit)
-
-        transactions_data = [
-            {
-                "id": t.id,
-                "character_name": t.character_name,
-                "symbol": t.symbol,
-                "type": t.transaction_type.value,
-                "quantity": t.quantity,
-                "price": t.price,
-                "total_amount": t.total_amount,
-                "timestamp": t.timestamp.isoformat(),
-                "timestep": t.timestep
-            }
-            for t in transactions
-        ]
-
-        return {
-            "transactions": transactions_data,
-            "count": len(transactions_data)
-        }
-
+        # Rows are read lazily while the response streams. Take the first one
+        # now so a failing query is reported as a 500 before streaming starts.
+        rows = db.iter_transaction_rows(character_name, symbol, limit)
+        first = await anyio.to_thread.run_sync(next, rows, None)
     except Exception as e:
         logger.error(f"Error getting transactions: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    if first is not None:
+        rows = chain((first,), rows)
+    return StreamingResponse(_stream_transactions(rows), media_type="application/json")
+
 
 @app.get("/api/admin/market-state")
 async def get_market_state():
@@ -611,7 +606,7 @@ async def get_market_state():
         Market state information
     """
     try:
-        market_state = db.get_market_state()
+        market_state = await anyio.to_thread.run_sync(db.get_market_state)
         return {
             "current_timestep": market_state.current_timestep,
             "last_updated": market_state.last_updated.isoformat(),
@@ -631,23 +626,31 @@ async def websocket_endpoint(websocket: WebSocket):
     Args:
         websocket: WebSocket connection
     """
-    await websocket_manager.connect(websocket)
+    # Read the initial market state in a worker thread while the handshake completes
+    snapshot_task = asyncio.ensure_future(anyio.to_thread.run_sync(market.get_market_snapshot))
+    try:
+        await websocket_manager.connect(websocket)
+    except BaseException:
+        snapshot_task.cancel()
+        raise
 
     try:
         # Send initial market state
-        snapshot = market.get_market_snapshot()
-        await websocket.send_json({
+        snapshot = await snapshot_task
+        await websocket.send_text(orjson.dumps({
             "type": "connected",
             "timestep": snapshot["timestep"],
             "prices": snapshot["prices"],
             "timestamp": snapshot["last_updated"]
-        })
+        }).decode())
 
-        # Keep connection alive and listen for messages
-        while True:
-            # Wait for messages (mainly to detect disconnect)
-            data = await websocket.receive_text()
-            logger.debug(f"Received WebSocket message: {data}")
+        # Clients never send anything, so just wait for the disconnect without
+        # decoding frames. uvicorn's ping/pong keeps idle connections alive.
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+        websocket_manager.disconnect(websocket)
+        logger.info("WebSocket client disconnected")
 
     except WebSocketDisconnect:
         websocket_manager.disconnect(websocket)
@@ -659,10 +662,16 @@ async def websocket_endpoint(websocket: WebSocket):
 
 # Run server
 if __name__ == "__main__":
+    # WebSocket clients, the broadcast queue, caches and the database write
+    # lock live in-process, so run a single worker.
+    # Set RELOAD=1 for auto-reload during development.
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
-        port=8000,
-        reload=True,
+        port=int(os.getenv("PORT", "8000")),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",  # uvloop has no Windows build
+        http="httptools",
+        workers=1,
+        reload=os.getenv("RELOAD", "").lower() in ("1", "true", "yes"),
         log_level="info"
     )
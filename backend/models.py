@@ -2,7 +2,7 @@
 Data models for GalacticStocks application.
 Defines the structure for companies, portfolios, transactions, and market state.
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional
 from enum import Enum
@@ -14,7 +14,7 @@ class TransactionType(str, Enum):
     SELL = "SELL"
 
 
-@dataclass
+@dataclass(slots=True)
 class Company:
     """Represents a galactic company in the stock market."""
     symbol: str
@@ -32,7 +32,7 @@ class Company:
             raise ValueError(f"Volatility must be non-negative, got {self.volatility}")
 
 
-@dataclass
+@dataclass(slots=True)
 class StockPrice:
     """Represents a stock price at a specific timestep."""
     symbol: str
@@ -49,7 +49,7 @@ class StockPrice:
             raise ValueError(f"Timestep must be non-negative, got {self.timestep}")
 
 
-@dataclass
+@dataclass(slots=True)
 class PortfolioHolding:
     """Represents a character's holdings of a specific stock."""
     character_name: str
@@ -78,7 +78,7 @@ class PortfolioHolding:
         return (current_price - self.avg_purchase_price) * self.quantity
 
 
-@dataclass
+@dataclass(slots=True)
 class Transaction:
     """Represents a stock transaction (buy or sell)."""
     id: Optional[int]
@@ -108,7 +108,7 @@ class Transaction:
             )
 
 
-@dataclass
+@dataclass(slots=True)
 class MarketState:
     """Represents the current state of the market."""
     current_timestep: int
@@ -121,7 +121,7 @@ class MarketState:
             raise ValueError(f"Timestep must be non-negative, got {self.current_timestep}")
 
 
-@dataclass
+@dataclass(slots=True)
 class PriceOverride:
     """Represents a GM price override from Google Sheets."""
     symbol: str
@@ -134,7 +134,7 @@ class PriceOverride:
             raise ValueError(f"Override price must be positive, got {self.override_price}")
 
 
-@dataclass
+@dataclass(slots=True)
 class Portfolio:
     """Aggregated portfolio view for a character."""
     character_name: str
@@ -142,6 +142,7 @@ class Portfolio:
     total_value: float
     total_cost_basis: float
     total_profit_loss: float
+    current_prices: list[float] = field(default_factory=list)  # Parallel to holdings
 
     @property
     def profit_loss_percentage(self) -> float:
@@ -151,7 +152,7 @@ class Portfolio:
         return (self.total_profit_loss / self.total_cost_basis) * 100
 
 
-@dataclass
+@dataclass(slots=True)
 class MarketSnapshot:
     """Current market prices for all stocks."""
     timestep: int
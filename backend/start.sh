@@ -5,4 +5,4 @@
 PORT=${PORT:-8000}
 
 # Start uvicorn server
-exec uvicorn main:app --host 0.0.0.0 --port $PORT
+exec uvicorn main:app --host 0.0.0.0 --port $PORT --loop uvloop --http httptools
@@ -4,9 +4,18 @@ Implements stochastic price generation using geometric Brownian motion.
 """
 import logging
 import math
-import random
 from datetime import datetime
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import orjson
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 from models import Company, StockPrice, MarketState, PriceOverride
 from database import Database
@@ -14,6 +23,68 @@ from google_sheets import GoogleSheetsClient
 
 logger = logging.getLogger(__name__)
 
+# Standard normal draws generated per refill of the scalar sampling buffer
+NORMAL_BUFFER_SIZE = 4096
+
+# Lowest price a simulated step can produce
+MIN_PRICE = 0.01
+LOG_MIN_PRICE = math.log(MIN_PRICE)
+
+# Time step used by generate_timestep
+STEP_DT = 1.0
+
+# Shared result for "no overrides", checked by identity in generate_timestep
+_EMPTY_OVERRIDES: Mapping[str, PriceOverride] = MappingProxyType({})
+
+
+def _simulate_paths_numpy(
+    start_price: float,
+    drift: float,
+    scale: float,
+    z: np.ndarray
+) -> np.ndarray:
+    """Step GBM paths with NumPy, one vectorized step at a time.
+
+    Args:
+        start_price: Price every path starts from
+        drift: Per-step drift, (trend - 0.5*volatility^2)*dt
+        scale: Per-step diffusion scale, volatility*sqrt(dt)
+        z: Standard normal draws, shape (n_paths, n_steps)
+
+    Returns:
+        Prices of shape (n_paths, n_steps + 1), starting with start_price
+    """
+    n_paths, n_steps = z.shape
+    log_paths = np.empty((n_paths, n_steps + 1))
+    log_paths[:, 0] = math.log(start_price)
+    increments = drift + scale * z
+    for t in range(n_steps):
+        # Clamp every step, like generate_timestep does
+        np.maximum(log_paths[:, t] + increments[:, t], LOG_MIN_PRICE, out=log_paths[:, t + 1])
+    paths = np.exp(log_paths, out=log_paths)
+    # exp(log(x)) need not round-trip exactly; report the real start price
+    paths[:, 0] = start_price
+    return paths
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True)
+    def _simulate_paths_numba(start_price, drift, scale, z):
+        """Step GBM paths in parallel, one path per thread (see _simulate_paths_numpy)."""
+        n_paths, n_steps = z.shape
+        paths = np.empty((n_paths, n_steps + 1))
+        for i in prange(n_paths):
+            price = start_price
+            paths[i, 0] = price
+            for t in range(n_steps):
+                price = max(price * math.exp(drift + scale * z[i, t]), MIN_PRICE)
+                paths[i, t + 1] = price
+        return paths
+
+    _simulate_paths = _simulate_paths_numba
+else:
+    _simulate_paths = _simulate_paths_numpy
+
 
 class StockMarket:
     """Manages the galactic stock market simulation."""
@@ -28,6 +99,26 @@ class StockMarket:
         self.db = db
         self.sheets_client = sheets_client
         self.companies: Dict[str, Company] = {}
+        # Company parameters as parallel arrays, in self.companies order
+        self._symbols: List[str] = []
+        self._symbol_index: Dict[str, int] = {}
+        self._trends = np.empty(0)
+        self._volatilities = np.empty(0)
+        self._initial_prices = np.empty(0)
+        # GBM drift and diffusion scale per company at STEP_DT
+        self._drifts = np.empty(0)
+        self._scales = np.empty(0)
+        # Company info published in market snapshots, rebuilt on load
+        self._companies_info: Dict[str, dict] = {}
+        # Sheets revision the loaded companies came from (None if unknown)
+        self._companies_revision: Optional[tuple] = None
+        self._rng = np.random.default_rng()
+        # Pre-drawn standard normals for the scalar _generate_price path
+        self._normal_buffer: List[float] = []
+        self._normal_index = 0
+        # Market snapshot as ((timestep, last_updated, price generation),
+        # snapshot, encoded snapshot)
+        self._snapshot_cache: Optional[Tuple[tuple, dict, bytes]] = None
 
         logger.info("StockMarket initialized")
 
@@ -47,6 +138,12 @@ class StockMarket:
             return self.companies
 
         try:
+            # Skip the rebuild when the sheet hasn't changed since the last load
+            revision = self.sheets_client.companies_revision()
+            if revision is not None and revision == self._companies_revision and self.companies:
+                logger.debug("Companies unchanged since last load")
+                return self.companies
+
             companies_list = self.sheets_client.load_companies()
 
             if not companies_list:
@@ -55,14 +152,38 @@ class StockMarket:
 
             # Convert to dictionary
             self.companies = {c.symbol: c for c in companies_list}
+            self._load_parameter_arrays()
+            self._companies_info = {
+                c.symbol: {
+                    "name": c.name,
+                    "symbol": c.symbol,
+                    "description": c.description
+                }
+                for c in companies_list
+            }
+            self._snapshot_cache = None  # Snapshot lists the companies
+            self._companies_revision = revision
 
-            logger.info(f"Loaded {len(self.companies)} companies: {list(self.companies.keys())}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Loaded %d companies: %s", len(self.companies), ", ".join(self.companies))
             return self.companies
 
         except Exception as e:
             logger.error(f"Failed to load companies: {e}")
             raise
 
+    def _load_parameter_arrays(self):
+        """Rebuild the parallel parameter arrays from self.companies."""
+        companies = list(self.companies.values())
+        count = len(companies)
+        self._symbols = list(self.companies)
+        self._symbol_index = {symbol: i for i, symbol in enumerate(self._symbols)}
+        self._trends = np.fromiter((c.trend for c in companies), dtype=np.float64, count=count)
+        self._volatilities = np.fromiter((c.volatility for c in companies), dtype=np.float64, count=count)
+        self._initial_prices = np.fromiter((c.initial_price for c in companies), dtype=np.float64, count=count)
+        self._drifts = (self._trends - 0.5 * self._volatilities * self._volatilities) * STEP_DT
+        self._scales = self._volatilities * math.sqrt(STEP_DT)
+
     def initialize_market(self):
         """Initialize the market with starting prices (timestep 0).
 
@@ -91,17 +212,19 @@ class StockMarket:
 
         # Save initial prices for all companies
         now = datetime.now()
+        initial_prices = []
         for symbol, company in self.companies.items():
-            stock_price = StockPrice(
+            initial_prices.append(StockPrice(
                 symbol=symbol,
                 timestep=0,
                 price=company.initial_price,
                 timestamp=now,
                 is_override=False
-            )
-            self.db.save_stock_price(stock_price)
+            ))
+
+            logger.info("Initialized %s at ¢%.2f", symbol, company.initial_price)
 
-            logger.info(f"Initialized {symbol} at ¢{company.initial_price:.2f}")
+        self.db.save_stock_prices(initial_prices)
 
         logger.info("Market initialization complete")
 
@@ -127,23 +250,49 @@ class StockMarket:
             New price
         """
         # Generate random component from standard normal distribution
-        z = random.gauss(0, 1)
+        z = self._next_normal()
 
-        # Calculate drift component
-        drift = (trend - 0.5 * volatility ** 2) * dt
+        drift, scale = self._gbm_constants(trend, volatility, dt)
 
         # Calculate stochastic component
-        diffusion = volatility * math.sqrt(dt) * z
+        diffusion = scale * z
 
         # Calculate new price
         new_price = current_price * math.exp(drift + diffusion)
 
         # Ensure price doesn't go below a minimum threshold
-        min_price = 0.01
-        new_price = max(new_price, min_price)
+        new_price = max(new_price, MIN_PRICE)
 
         return new_price
 
+    @staticmethod
+    def _gbm_constants(trend: float, volatility: float, dt: float) -> Tuple[float, float]:
+        """Compute the per-step GBM drift and diffusion scale.
+
+        Args:
+            trend: Drift parameter
+            volatility: Volatility parameter
+            dt: Time step
+
+        Returns:
+            Tuple of (drift, diffusion scale)
+        """
+        return (trend - 0.5 * volatility * volatility) * dt, volatility * math.sqrt(dt)
+
+    def _next_normal(self) -> float:
+        """Take the next standard normal draw, refilling the buffer in bulk.
+
+        Returns:
+            Standard normal random value
+        """
+        if self._normal_index >= len(self._normal_buffer):
+            # tolist() so each draw is a plain Python float
+            self._normal_buffer = self._rng.standard_normal(NORMAL_BUFFER_SIZE).tolist()
+            self._normal_index = 0
+        z = self._normal_buffer[self._normal_index]
+        self._normal_index += 1
+        return z
+
     def calculate_next_price(
         self,
         symbol: str,
@@ -166,6 +315,102 @@ class StockMarket:
         """
         return self._generate_price(current_price, trend, volatility)
 
+    def calculate_next_prices(
+        self,
+        trends: np.ndarray,
+        volatilities: np.ndarray,
+        current_prices: np.ndarray,
+        dt: float = 1.0
+    ) -> np.ndarray:
+        """Calculate next prices for several stocks in one vectorized step.
+
+        Uses the same geometric Brownian motion step as _generate_price.
+
+        Args:
+            trends: Drift parameters
+            volatilities: Volatility parameters
+            current_prices: Current stock prices
+            dt: Time step (default 1.0)
+
+        Returns:
+            Array of calculated next prices, in input order
+        """
+        drifts = (trends - 0.5 * volatilities ** 2) * dt
+        scales = volatilities * math.sqrt(dt)
+        return self._step_prices(drifts, scales, current_prices)
+
+    def _step_prices(
+        self,
+        drifts: np.ndarray,
+        scales: np.ndarray,
+        current_prices: np.ndarray
+    ) -> np.ndarray:
+        """Apply one GBM step using precomputed drift and diffusion scales.
+
+        Args:
+            drifts: Per-stock drift, (trend - 0.5*volatility^2)*dt
+            scales: Per-stock diffusion scale, volatility*sqrt(dt)
+            current_prices: Current stock prices
+
+        Returns:
+            Array of next prices, in input order
+        """
+        # Zero-scale (pegged) stocks don't need a draw
+        random_lanes = scales != 0.0
+        if random_lanes.all():
+            z = self._rng.standard_normal(len(current_prices))
+        else:
+            z = np.zeros(len(current_prices))
+            z[random_lanes] = self._rng.standard_normal(np.count_nonzero(random_lanes))
+
+        # Step and clamp in log space, then exponentiate once
+        log_prices = np.log(current_prices)
+        log_prices += drifts
+        log_prices += scales * z
+        np.maximum(log_prices, LOG_MIN_PRICE, out=log_prices)
+        return np.exp(log_prices, out=log_prices)
+
+    def simulate_paths(
+        self,
+        company: Company,
+        n_paths: int,
+        n_steps: int,
+        antithetic: bool = True
+    ) -> np.ndarray:
+        """Simulate possible future price paths for a stock.
+
+        Paths start at the latest price and follow the same GBM step as
+        generate_timestep. Uses a parallel Numba kernel when numba is
+        installed and NumPy otherwise.
+
+        With antithetic sampling, paths come in pairs driven by Z and -Z,
+        which halves the normal draws and lowers the variance of estimates
+        taken across paths.
+
+        Args:
+            company: Company whose trend and volatility drive the paths
+            n_paths: Number of paths
+            n_steps: Number of timesteps per path
+            antithetic: Pair each path with its mirror image (default True)
+
+        Returns:
+            Prices of shape (n_paths, n_steps + 1), starting with the current price
+
+        Raises:
+            ValueError: If path counts invalid
+        """
+        if n_paths < 1 or n_steps < 1:
+            raise ValueError(f"Need at least one path and one step, got {n_paths}x{n_steps}")
+
+        current_price = self.db.get_all_latest_prices().get(company.symbol, company.initial_price)
+        drift, scale = self._gbm_constants(company.trend, company.volatility, STEP_DT)
+        if antithetic:
+            half = self._rng.standard_normal(((n_paths + 1) // 2, n_steps))
+            z = np.concatenate((half, -half))[:n_paths]
+        else:
+            z = self._rng.standard_normal((n_paths, n_steps))
+        return _simulate_paths(current_price, drift, scale, z)
+
     def generate_timestep(self) -> MarketState:
         """Generate a new market timestep with updated prices for all stocks.
 
@@ -184,16 +429,14 @@ class StockMarket:
             RuntimeError: If generation is already in progress
             Exception: If generation fails
         """
-        # Check and acquire lock
-        if self.db.is_generation_locked():
+        # Check and acquire lock in one step
+        if not self.db.try_acquire_generation_lock():
             logger.warning("Timestep generation already in progress")
             raise RuntimeError("Timestep generation already in progress")
+        logger.info("Acquired timestep generation lock")
+        lock_held = True
 
         try:
-            # Acquire lock
-            self.db.set_generation_lock(True)
-            logger.info("Acquired timestep generation lock")
-
             # Get current market state
             market_state = self.db.get_market_state()
             current_timestep = market_state.current_timestep
@@ -208,57 +451,77 @@ class StockMarket:
             if not self.companies:
                 raise ValueError("No companies loaded, cannot generate timestep")
 
-            # Generate new prices
+            # Current prices, from one (usually cached) query rather than one
+            # per company
+            symbols = self._symbols
+            latest_prices = self.db.get_all_latest_prices()
+            current_prices = self._initial_prices.copy()
+            for i, symbol in enumerate(symbols):
+                current_price = latest_prices.get(symbol)
+                if current_price is not None:
+                    current_prices[i] = current_price
+                elif symbol not in overrides:
+                    # Use initial price if no history exists
+                    logger.warning(
+                        "No price history for %s, using initial price ¢%.2f",
+                        symbol, current_prices[i]
+                    )
+
+            # Step every price at once, then swap in any GM overrides
+            count = len(symbols)
+            calculated_prices = self._step_prices(self._drifts, self._scales, current_prices)
+            if overrides is _EMPTY_OVERRIDES:
+                final_prices = calculated_prices
+                override_flags = [False] * count
+            else:
+                override_mask = np.fromiter((s in overrides for s in symbols), dtype=bool, count=count)
+                override_prices = np.fromiter(
+                    (overrides[s].override_price if s in overrides else 0.0 for s in symbols),
+                    dtype=np.float64,
+                    count=count
+                )
+                final_prices = np.where(override_mask, override_prices, calculated_prices)
+                override_flags = override_mask.tolist()
+
+            info_enabled = logger.isEnabledFor(logging.INFO)
             now = datetime.now()
             new_prices = {}
+            stock_prices = []
 
-            for symbol, company in self.companies.items():
-                # Check for override first
-                if symbol in overrides:
-                    new_price = overrides[symbol].override_price
-                    is_override = True
-                    logger.info(f"Applied override for {symbol}: ¢{new_price:.2f}")
-                else:
-                    # Get current price
-                    latest_price = self.db.get_latest_price(symbol)
-                    if not latest_price:
-                        # Use initial price if no history exists
-                        current_price = company.initial_price
-                        logger.warning(
-                            f"No price history for {symbol}, using initial price ¢{current_price:.2f}"
-                        )
-                    else:
-                        current_price = latest_price.price
-
-                    # Generate new price
-                    new_price = self._generate_price(
-                        current_price=current_price,
-                        trend=company.trend,
-                        volatility=company.volatility
-                    )
-                    is_override = False
-
-                # Save new price
-                stock_price = StockPrice(
+            # tolist() gives Python floats
+            for symbol, current_price, new_price, is_override in zip(
+                symbols, current_prices.tolist(), final_prices.tolist(), override_flags
+            ):
+                stock_prices.append(StockPrice(
                     symbol=symbol,
                     timestep=next_timestep,
                     price=new_price,
                     timestamp=now,
                     is_override=is_override
-                )
-                self.db.save_stock_price(stock_price)
+                ))
                 new_prices[symbol] = new_price
 
-                change_pct = ((new_price - current_price) / current_price * 100) if latest_price else 0
-                logger.info(
-                    f"Generated price for {symbol}: ¢{new_price:.2f} "
-                    f"({change_pct:+.2f}%)"
-                )
+                if not info_enabled:
+                    continue
+                if is_override:
+                    logger.info("Applied override for %s: ¢%.2f", symbol, new_price)
+                else:
+                    change_pct = (new_price - current_price) / current_price * 100
+                    logger.info(
+                        "Generated price for %s: ¢%.2f (%+.2f%%)",
+                        symbol, new_price, change_pct
+                    )
 
-            # Update market state
+            # Save all prices and the new market state, releasing the lock,
+            # in one transaction
             market_state.current_timestep = next_timestep
             market_state.last_updated = now
-            self.db.update_market_state(market_state)
+            self.db.finalize_timestep(stock_prices, market_state)
+            lock_held = False
+            logger.info("Released timestep generation lock")
+
+            # Build the new snapshot now so clients don't each pay for it
+            self._snapshot_entry(market_state)
 
             logger.info(f"Timestep {next_timestep} generation complete with {len(new_prices)} prices")
 
@@ -269,25 +532,30 @@ class StockMarket:
             raise
 
         finally:
-            # Always release lock
-            self.db.set_generation_lock(False)
-            logger.info("Released timestep generation lock")
+            # Release the lock if finalizing didn't get to it
+            if lock_held:
+                self.db.set_generation_lock(False)
+                logger.info("Released timestep generation lock")
 
-    def _load_overrides(self) -> Dict[str, PriceOverride]:
+    def _load_overrides(self) -> Mapping[str, PriceOverride]:
         """Load price overrides from Google Sheets.
 
         Returns:
-            Dictionary mapping symbol to PriceOverride
+            Read-only mapping of symbol to PriceOverride; _EMPTY_OVERRIDES
+            when there are none
         """
         if not self.sheets_client.is_available():
-            return {}
+            return _EMPTY_OVERRIDES
 
         try:
             overrides_list = self.sheets_client.load_price_overrides()
-            return {o.symbol: o for o in overrides_list}
         except Exception as e:
             logger.error(f"Failed to load price overrides: {e}")
-            return {}
+            return _EMPTY_OVERRIDES
+
+        if not overrides_list:
+            return _EMPTY_OVERRIDES
+        return MappingProxyType({o.symbol: o for o in overrides_list})
 
     def get_current_prices(self) -> Dict[str, float]:
         """Get current prices for all stocks.
@@ -309,9 +577,16 @@ class StockMarket:
         """
         return self.db.get_price_history(symbol, n_periods)
 
-    def get_market_snapshot(self) -> dict:
+    def get_market_snapshot(self, market_state: Optional[MarketState] = None) -> dict:
         """Get complete market snapshot with prices and state.
 
+        The snapshot is cached until the timestep or last update time changes,
+        any price is written, or the companies are reloaded. It is shared
+        between callers, so don't modify it.
+
+        Args:
+            market_state: Current market state, if the caller already has it
+
         Returns:
             Dictionary with market data:
             - timestep: Current timestep number
@@ -319,30 +594,65 @@ class StockMarket:
             - prices: Dict of symbol -> price
             - companies: Dict of symbol -> company info
         """
-        market_state = self.db.get_market_state()
-        all_prices = self.get_current_prices()
+        return self._snapshot_entry(market_state)[1]
 
-        # Filter prices to only include companies that are currently defined
-        prices = {
-            symbol: price
-            for symbol, price in all_prices.items()
-            if symbol in self.companies
-        }
+    def get_market_snapshot_bytes(self) -> bytes:
+        """Get the market snapshot encoded as JSON.
 
-        companies_info = {
-            symbol: {
-                "name": company.name,
-                "symbol": company.symbol,
-                "description": company.description
-            }
-            for symbol, company in self.companies.items()
-        }
+        Returns:
+            JSON-encoded market snapshot, cached like get_market_snapshot
+        """
+        return self._snapshot_entry()[2]
+
+    def _snapshot_entry(self, market_state: Optional[MarketState] = None) -> Tuple[tuple, dict, bytes]:
+        """Get the cached snapshot entry, rebuilding it if the market moved on.
+
+        Args:
+            market_state: Current market state, if the caller already has it
+
+        Returns:
+            Tuple of (cache key, snapshot, encoded snapshot)
+        """
+        # Read the price generation before any prices, so a write that lands
+        # during the build leaves this entry stale rather than wrongly fresh
+        generation = self.db.price_cache_generation
+        if market_state is None:
+            market_state = self.db.get_market_state()
+        key = (market_state.current_timestep, market_state.last_updated, generation)
+        cached = self._snapshot_cache
+        if cached is not None and cached[0] == key:
+            return cached
+
+        snapshot = self._build_snapshot(market_state)
+        entry = (key, snapshot, orjson.dumps(snapshot))
+        self._snapshot_cache = entry
+        return entry
+
+    def _build_snapshot(self, market_state: MarketState) -> dict:
+        """Build the market snapshot from the database.
+
+        Args:
+            market_state: Current market state
+
+        Returns:
+            Market snapshot dictionary
+        """
+        all_prices = self.get_current_prices()
+
+        # Filter prices to only include companies that are currently defined.
+        # Usually every priced symbol is a company, so a C-level key view
+        # comparison lets the dict be copied whole.
+        symbols = self._symbol_index.keys()
+        if all_prices.keys() <= symbols:
+            prices = dict(all_prices)
+        else:
+            prices = {symbol: all_prices[symbol] for symbol in all_prices.keys() & symbols}
 
         return {
             "timestep": market_state.current_timestep,
             "last_updated": market_state.last_updated.isoformat(),
             "prices": prices,
-            "companies": companies_info
+            "companies": self._companies_info
         }
 
     def apply_override(self, symbol: str, price: float) -> StockPrice:
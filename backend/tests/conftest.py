@@ -0,0 +1,50 @@
+"""
+Shared fixtures for the backend tests.
+Runs the FastAPI app against a private in-memory database with the mock sheets client.
+"""
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Backend modules import each other by bare name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import admin_routes
+import main
+from database import Database
+from google_sheets import MockGoogleSheetsClient
+from models import Company, StockPrice
+from stock_simulator import StockMarket
+
+ADMIN_HEADERS = {"X-Admin-Password": admin_routes.ADMIN_PASSWORD}
+
+
+@pytest.fixture
+def db():
+    """In-memory database seeded with one company priced at ¢100."""
+    database = Database(":memory:")
+    database.insert_companies([
+        Company(symbol="ZORG", name="Zorg Mining", initial_price=100.0, trend=0.01, volatility=0.1)
+    ])
+    database.save_stock_prices([
+        StockPrice(symbol="ZORG", timestep=0, price=100.0, timestamp=datetime.now())
+    ])
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    """Test client wired to the seeded database.
+
+    The app's lifespan isn't run, so no database file is opened on disk.
+    """
+    market = StockMarket(db, MockGoogleSheetsClient(db))
+    monkeypatch.setattr(main, "db", db)
+    monkeypatch.setattr(main, "market", market)
+    monkeypatch.setattr(admin_routes, "db_instance", db)
+    monkeypatch.setattr(admin_routes, "market_instance", market)
+    return TestClient(main.app)
@@ -0,0 +1,68 @@
+"""
+Tests for admin route authentication and company validation.
+"""
+from conftest import ADMIN_HEADERS
+
+NEW_COMPANY = {
+    "symbol": "qux",
+    "name": "Qux Freight",
+    "initial_price": 50.0,
+    "trend": 0.0,
+    "volatility": 0.2
+}
+
+
+def test_create_company_uppercases_symbol(client, db):
+    response = client.post("/api/admin/companies", json=NEW_COMPANY, headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.json()["symbol"] == "QUX"
+    assert db.get_company("QUX") is not None
+
+
+def test_create_company_rejects_trailing_newline(client, db):
+    response = client.post(
+        "/api/admin/companies",
+        json={**NEW_COMPANY, "symbol": "abc\n"},
+        headers=ADMIN_HEADERS
+    )
+    assert response.status_code == 400
+    assert db.get_company("ABC\n") is None
+
+
+def test_create_company_rejects_bad_symbol(client):
+    response = client.post(
+        "/api/admin/companies",
+        json={**NEW_COMPANY, "symbol": "TOO-LONG-SYMBOL"},
+        headers=ADMIN_HEADERS
+    )
+    assert response.status_code == 400
+
+
+def test_unauthenticated_invalid_body_is_401(client):
+    # The password is checked before the body, so the schema isn't revealed
+    for method, path in (
+        ("post", "/api/admin/companies"),
+        ("patch", "/api/admin/companies/ZORG"),
+        ("post", "/api/admin/timestep/generate"),
+    ):
+        response = client.request(method, path, json={"volatility": "high", "overrides": 1})
+        assert response.status_code == 401, path
+        assert response.json() == {"detail": "Invalid admin password"}
+
+
+def test_wrong_password_is_401(client):
+    response = client.post(
+        "/api/admin/companies",
+        json=NEW_COMPANY,
+        headers={"X-Admin-Password": "wrong"}
+    )
+    assert response.status_code == 401
+
+
+def test_authenticated_invalid_body_is_422(client):
+    response = client.patch(
+        "/api/admin/companies/ZORG",
+        json={"volatility": "high"},
+        headers=ADMIN_HEADERS
+    )
+    assert response.status_code == 422
@@ -0,0 +1,78 @@
+"""
+Tests for the buy and sell endpoints and their error responses.
+"""
+
+
+def _trade(client, side, symbol="ZORG", quantity=5):
+    return client.post(f"/api/transaction/{side}", json={
+        "character_name": "Vex",
+        "symbol": symbol,
+        "quantity": quantity
+    })
+
+
+def test_buy_then_sell(client):
+    response = _trade(client, "buy", quantity=5)
+    assert response.status_code == 200
+    assert response.json()["new_holding"] == {
+        "symbol": "ZORG", "quantity": 5, "avg_purchase_price": 100.0
+    }
+
+    response = _trade(client, "sell", quantity=2)
+    assert response.status_code == 200
+    assert response.json()["new_holding"]["quantity"] == 3
+
+
+def test_sell_whole_holding_returns_no_holding(client):
+    _trade(client, "buy", quantity=2)
+
+    response = _trade(client, "sell", quantity=2)
+    assert response.status_code == 200
+    assert response.json()["new_holding"] is None
+
+
+def test_buy_unknown_symbol_is_404(client):
+    response = _trade(client, "buy", symbol="NOPE")
+    assert response.status_code == 404
+    assert "NOPE" in response.json()["detail"]
+
+
+def test_sell_unknown_symbol_is_404(client):
+    response = _trade(client, "sell", symbol="NOPE")
+    assert response.status_code == 404
+
+
+def test_sell_without_holding_is_400(client):
+    response = _trade(client, "sell")
+    assert response.status_code == 400
+    assert "No holdings" in response.json()["detail"]
+
+
+def test_sell_more_than_held_is_400(client, db):
+    _trade(client, "buy", quantity=1)
+
+    response = _trade(client, "sell", quantity=2)
+    assert response.status_code == 400
+    assert "Insufficient shares" in response.json()["detail"]
+    # The rejected sale leaves the holding alone
+    assert db.get_portfolio("Vex").holdings[0].quantity == 1
+
+
+def test_malformed_json_is_422(client):
+    response = client.post(
+        "/api/transaction/buy",
+        content=b'{"character_name": "Vex",',
+        headers={"Content-Type": "application/json"}
+    )
+    assert response.status_code == 422
+
+
+def test_invalid_fields_are_422_with_body_locations(client):
+    response = client.post("/api/transaction/sell", json={
+        "character_name": "",
+        "symbol": "ZORG",
+        "quantity": 0
+    })
+    assert response.status_code == 422
+    locations = {tuple(error["loc"]) for error in response.json()["detail"]}
+    assert locations == {("body", "character_name"), ("body", "quantity")}
@@ -1,7 +1,7 @@
 /**
  * Application context for managing global state.
  */
-import React, { createContext, useContext, useState, useEffect, useCallback } from 'react';
+import React, { createContext, useContext, useState, useEffect, useCallback, useRef } from 'react';
 import { marketApi, portfolioApi } from '../api/client';
 import { getMarketWebSocket } from '../api/websocket';
 import type { MarketData, Portfolio, WebSocketMessage } from '../types';
@@ -41,6 +41,12 @@ export const AppProvider: React.FC<AppProviderProps> = ({ children }) => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [currentTimestep, setCurrentTimestep] = useState(0);
+  // Latest market data for the WebSocket handler, without re-subscribing on every update
+  const marketDataRef = useRef<MarketData | null>(null);
+
+  useEffect(() => {
+    marketDataRef.current = marketData;
+  }, [marketData]);
 
   const setCharacterName = useCallback((name: string) => {
     setCharacterNameState(name);
@@ -108,6 +114,30 @@ export const AppProvider: React.FC<AppProviderProps> = ({ children }) => {
         });
 
         // Refresh portfolio to update values
+        if (characterName) {
+          refreshPortfolio();
+        }
+      } else if (message.type === 'timestep_delta') {
+        console.log('[AppContext] Timestep delta for:', message.timestep);
+        setCurrentTimestep(message.timestep);
+
+        // A delta only applies on top of the previous timestep; otherwise
+        // reload the full market
+        const prev = marketDataRef.current;
+        if (!prev || prev.timestep !== message.timestep - 1) {
+          refreshMarket();
+        } else {
+          setMarketData((current) => {
+            if (!current) return current;
+            return {
+              ...current,
+              timestep: message.timestep,
+              last_updated: message.timestamp,
+              prices: { ...current.prices, ...message.prices },
+            };
+          });
+        }
+
         if (characterName) {
           refreshPortfolio();
         }
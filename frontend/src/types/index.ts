@@ -65,8 +65,9 @@ export interface TransactionResponse {
 }
 
 export interface WebSocketMessage {
-  type: 'connected' | 'timestep_updated';
+  type: 'connected' | 'timestep_updated' | 'timestep_delta';
   timestep: number;
+  // Full price map, or only the changed prices for 'timestep_delta'
   prices: Record<string, number>;
   timestamp: string;
 }
@@ -22,4 +22,4 @@ fi
 
 # Start the server
 echo "Starting FastAPI server on http://localhost:8000"
-python main.py
+RELOAD=1 python main.py